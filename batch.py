@@ -0,0 +1,211 @@
+"""
+BSD 3-Clause License.
+
+Copyright (c) 2022 CNRS - Université de Strasbourg.
+All rights reserved.
+
+Author : [Antonio Pena Corredor] [antonio.penacorredor@ipcms.unistra.fr]
+
+This software is a reflection choice framework for Resonant Elastic X-ray Scattering.
+The program consists of different ".py" modules and a "GUI.ui" graphic interface.
+- main.py: backbone, direct exchange with interface.
+- intensity module.py: module for the calculation of the reflection intensities.
+- sensitivity module.py: module for the calculation of the reflection sensitivities.
+- campaign module.py: module for the bookkeeping of the FDMNES campaigns.
+- convolution module.py: module for the broadening of the FDMNES spectra.
+- surrogate module.py: module for the surrogate model of the FDMNES intensities.
+- cube module.py: module for the storage of the energy resolved results.
+- element module.py: module for the element data (Element_data folder).
+- cif module.py: module for the reading of .cif files.
+- batch.py: many .cif files without interaction.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+* Redistributions of source code must retain the above copyright notice, this
+  list of conditions and the following disclaimer.
+
+* Redistributions in binary form must reproduce the above copyright notice,
+  this list of conditions and the following disclaimer in the documentation
+  and/or other materials provided with the distribution.
+
+* Neither the name of the copyright holder nor the names of its
+  contributors may be used to endorse or promote products derived from
+  this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+The program has been coded and tested on python 3.9
+The version is indicated for those modules not included in the standard Python library
+
+Batch module, many .cif files without interaction.
+
+Every structure goes through the intensity calculation, FDMNES and the
+sensitivity calculation in its own process and FDMNES folder, and the
+rankings are gathered in a single table.
+
+Usage: python batch.py config.json "structures/*.cif" [-j 4] [-o ranking.csv]
+
+The configuration file (JSON) holds, for example:
+{"maxhkl": 4, "forbidden": false, "edges": ["Mn"],
+ "refine": {"Mn1": "x y z", "all": "occ"},
+ "E_start": -5, "E_stop": 30, "E_step": 0.5, "percent": 2,
+ "coupled": false, "design": "sobol", "nsim": 64}
+
+Optional: "tolerance" (early stop on the ranking convergence) and, for a
+low-fidelity screening before the full runs, "two_stage": true with
+"top" reflections, "points" parameter sets and "adaptive" energy steps.
+"""
+
+import argparse
+import json
+import os
+from glob import glob
+from pathlib import Path
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import pandas as pd  # v1.4.2
+
+# Own modules, to be placed in same folder:
+import intensity_module as im
+import sensitivity_module as sm
+import campaign_module as cm
+import element_module as el
+import cif_module as cif
+from main_no_inter import Crystal, get_crystal_info, run_stage, fun_two_stage
+
+# columns of the refined items, as in refinement_checked_list
+ITEMS = {'x': 0, 'y': 1, 'z': 2, 'occ': 3}
+
+# optional settings of the configuration and their default values
+DEFAULTS = {'forbidden': False, 'coupled': False, 'design': 'combinations',
+            'nsim': None, 'archive': False, 'python_convolution': False,
+            'tolerance': None, 'two_stage': False, 'top': 10, 'points': None,
+            'adaptive': False}
+
+
+def refined_items(atom_list, refine):
+    """Refined items (atom*4 + x, y, z, occ) from the configuration.
+
+    refine maps atom labels, or "all", to the refined parameters.
+    """
+    items = set()
+    for index, atom in enumerate(atom_list):
+        for label in (atom[0], 'all'):
+            for parameter in refine.get(label, '').replace(',', ' ').split():
+                items.add(index*4 + ITEMS[parameter.lower()])
+    if len(items) == 0:
+        raise ValueError("No items have been chosen.")
+    return sorted(items)
+
+
+def structure_names(files):
+    """Name of the campaign of every .cif file, unique in the batch.
+
+    The file name is used when no other file has it, else the path from
+    the common folder (a/x.cif and b/x.cif give a_x and b_x).
+    """
+    stems = Counter(Path(file_cif).stem for file_cif in files)
+    common = os.path.commonpath([os.path.abspath(file_cif) for file_cif in files])
+    names, taken = [], set()
+    for file_cif in files:
+        name = Path(file_cif).stem
+        if stems[name] > 1:
+            relative = Path(os.path.relpath(os.path.abspath(file_cif), common))
+            name = '_'.join(relative.with_suffix('').parts)
+        unique, count = name, 1
+        while unique in taken:  # e.g. a_x.cif next to a/x.cif
+            count += 1
+            unique = f'{name}_{count}'
+        taken.add(unique)
+        names.append(unique)
+    return names
+
+
+def run_structure(file_cif, name, config, fdmnes_dir):
+    """Intensities, FDMNES campaign and ranking of one structure."""
+    crystal = Crystal()
+    crystal.name = name
+    get_crystal_info(crystal, cif.read_cif(file_cif))
+
+    crystal.forbidden = config['forbidden']
+    crystal.maxhkl = int(config['maxhkl'])
+    crystal.edge_checked_list = [index for index, atom in enumerate(crystal.atom_list)
+                                 if el.parse_label(atom[0])[0] in config['edges']]
+    if len(crystal.edge_checked_list) == 0:
+        raise ValueError("No edges have been chosen.")
+    crystal.refinement_checked_list = refined_items(crystal.atom_list, config['refine'])
+
+    crystal.reflections = im.intensity_calculation(crystal)
+    crystal.reflections_dis = crystal.reflections  # no hkil notation here
+
+    for setting in ('E_start', 'E_stop', 'E_step', 'percent'):
+        setattr(crystal, setting, float(config[setting]))
+    for setting in DEFAULTS:
+        setattr(crystal, setting, config[setting])
+
+    # each structure runs FDMNES in its own folder, the store is shared
+    crystal.workspace = cm.Workspace(sm.home, fdmnes_dir, crystal.name,
+                                     run_dir=Path(fdmnes_dir, 'Batch', crystal.name))
+    if crystal.two_stage:  # screening, then the best reflections at full fidelity
+        fun_two_stage(crystal)
+        results = crystal.results
+    else:
+        results = run_stage(crystal)
+    results.insert(0, 'Structure', crystal.name)
+    return results
+
+
+def main(arguments=None):
+    """Run every .cif file of the pattern and write the global ranking."""
+    parser = argparse.ArgumentParser(description='Reflection ranking for many .cif files.')
+    parser.add_argument('config', help='JSON file with the settings of the campaigns')
+    parser.add_argument('pattern', help='glob pattern of the .cif files, e.g. "cifs/*.cif"')
+    parser.add_argument('-j', '--jobs', type=int, default=max(1, (os.cpu_count() or 2)//2),
+                        help='structures processed at the same time')
+    parser.add_argument('-o', '--output', default='batch_ranking.csv',
+                        help='table with the rankings of all the structures')
+    parser.add_argument('--fdmnes', default=str(Path(sm.home, 'FDMNES')),
+                        help='folder of the FDMNES executable')
+    args = parser.parse_args(arguments)
+
+    with open(args.config) as f:
+        config = {**DEFAULTS, **json.load(f)}
+
+    files = sorted(glob(args.pattern))
+    if len(files) == 0:
+        raise FileNotFoundError(f"No .cif files match {args.pattern}.")
+    if not Path(args.fdmnes).is_dir():
+        raise FileNotFoundError(f"No FDMNES folder at {args.fdmnes}.")
+
+    rankings = []
+    with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+        futures = {pool.submit(run_structure, file_cif, name, config, args.fdmnes): file_cif
+                   for file_cif, name in zip(files, structure_names(files))}
+        for future in as_completed(futures):
+            try:
+                rankings.append(future.result())
+                print(f'{futures[future]} done.')
+            except Exception as error:  # the other structures go on
+                print(f'{futures[future]} failed: {error}')
+
+    if len(rankings) == 0:
+        raise RuntimeError("No structure could be processed.")
+    ranking = pd.concat(rankings, ignore_index=True)
+    ranking = ranking.sort_values('Weights', ascending=False, ignore_index=True)
+    ranking.to_csv(args.output, sep=',')
+    print(f'Ranking of {len(rankings)} structures written to {args.output}.')
+    return ranking
+
+
+if __name__ == '__main__':  # only executes the below code if  main
+    main()
@@ -0,0 +1,325 @@
+"""
+BSD 3-Clause License.
+
+Copyright (c) 2022 CNRS - Université de Strasbourg.
+All rights reserved.
+
+Author : [Antonio Pena Corredor] [antonio.penacorredor@ipcmss.unistra.fr]
+
+This software is a reflection choice framework for Resonant Elastic X-ray Scattering.
+The program consists of different ".py" modules and a "GUI.ui" graphic interface.
+- main.py: backbone, direct exchange with interface.
+- intensity module.py: module for the calculation of the reflection intensities.
+- sensitivity module.py: module for the calculation of the reflection sensitivities.
+- campaign module.py: module for the bookkeeping of the FDMNES campaigns.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+* Redistributions of source code must retain the above copyright notice, this
+  list of conditions and the following disclaimer.
+
+* Redistributions in binary form must reproduce the above copyright notice,
+  this list of conditions and the following disclaimer in the documentation
+  and/or other materials provided with the distribution.
+
+* Neither the name of the copyright holder nor the names of its
+  contributors may be used to endorse or promote products derived from
+  this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+The program has been coded and tested on python 3.9
+The version is indicated for those modules not included in the standard Python library
+
+Module for the bookkeeping of the FDMNES campaigns.
+"""
+import os
+import io
+import json
+import hashlib
+import shutil
+import tarfile
+import tempfile
+from pathlib import Path
+import numpy as np  # v1.21.5
+
+
+class Workspace:
+    """Absolute paths of a campaign.
+
+    Every stage reads and writes through these paths, never through the
+    current directory. Each crystal runs FDMNES in its own folder
+    (FDMNES/Campaigns/<name> unless run_dir is given), with its own
+    fdmfile.txt, inputs and results, so several crystals can run at once.
+    Only the SimulationStore is shared, its files are written atomically.
+    """
+
+    def __init__(self, root, fdmnes_dir, name, stage=None, run_dir=None):
+        self.root = Path(root).resolve()  # program folder
+        self.fdmnes = Path(fdmnes_dir).resolve()
+        self.name = name
+        self.stage = stage  # e.g. screening, kept apart from the main runs
+
+        # folder FDMNES runs in (fdmfile.txt), one per crystal
+        if run_dir is None:
+            run_dir = Path(self.fdmnes, 'Campaigns', name)
+        self.run_dir = Path(run_dir).resolve()
+
+        # folder names are relative to run_dir, as written in the inputs
+        suffix = '' if stage is None else f'_{stage}'
+        self.results_name = f'FileResults{suffix}'
+
+        self.sasaki = Path(self.root, 'Sasaki_anomalous')
+        self.inputs = Path(self.run_dir, f'{name}{suffix}_input')
+        self.results = Path(self.run_dir, self.results_name)
+        self.store = Path(self.fdmnes, 'SimulationStore')  # shared by all
+
+    def create(self):
+        """Create the campaign folders."""
+        os.makedirs(self.inputs, exist_ok=True)
+        os.makedirs(self.results, exist_ok=True)
+
+    def input_path(self, run):
+        """Input file of a run."""
+        return Path(self.inputs, f'input_{run}.txt')
+
+    def result_path(self, run):
+        """Convoluted result file of a run."""
+        return Path(self.results, f'result_{run}_conv.txt')
+
+
+def input_key(text):
+    """Hash of an FDMNES input, the output file name is not considered."""
+    lines = text.splitlines()
+    # the line after Filout only names the result, it changes for every run
+    content = [line.strip() for i, line in enumerate(lines)
+               if i == 0 or lines[i - 1].strip() != 'Filout']
+    return hashlib.sha256('\n'.join(content).encode()).hexdigest()
+
+
+def content_hash(data):
+    """Hash of the content of a file (bytes)."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def valid_result(source, shape):
+    """Check if a result is complete (reflection x energy values).
+
+    The source is a file path or a file object taken from an archive.
+    """
+    try:
+        data = np.loadtxt(source, skiprows=1, ndmin=2).T[2:]
+    except (OSError, ValueError):  # missing or still being written
+        return False
+    return data.shape == tuple(shape)
+
+
+def result_name(key, suffix='_conv'):
+    """Name of a result in the store and the results archive."""
+    return f'{key}{suffix}.txt'
+
+
+def stored_result(store_dir, key, suffix='_conv'):
+    """Path of a stored result, None if the input was never simulated."""
+    file_path = os.path.join(store_dir, result_name(key, suffix))
+    return Path(file_path) if os.path.exists(file_path) else None
+
+
+def store_result(store_dir, key, file_path, suffix='_conv'):
+    """Keep a result in the store, under the key of its input."""
+    os.makedirs(store_dir, exist_ok=True)
+    # a unique temporary name, campaigns running together share the store
+    handle, temporary = tempfile.mkstemp(dir=store_dir, suffix='.tmp')
+    os.close(handle)
+    shutil.copyfile(file_path, temporary)
+    os.replace(temporary, Path(store_dir, result_name(key, suffix)))  # never half written
+
+
+def fan_out_results(run_keys, results_dir, store_dir, shape, archive=None,
+                    suffix='_conv', valid=None, done_runs=()):
+    """Give every run its result from the simulated duplicate or the store.
+
+    New results are copied into the store, so that they are reused by later
+    campaigns. Runs whose input is packed in the results archive are left
+    as they are. The suffix selects the convolved ('_conv') or raw ('') results,
+    checked by "valid". Runs in done_runs are known to have their result
+    and are not looked at again. Returns the number of runs with a result.
+    """
+    if valid is None:
+        def valid(file_path):
+            return valid_result(file_path, shape)
+
+    # one listing of the results, not a stat for every run
+    present = set(os.listdir(results_dir)) if os.path.isdir(results_dir) else set()
+    done = 0
+    for run, key in enumerate(run_keys):
+        name = f'result_{run}{suffix}.txt'
+        if run in done_runs or (archive is not None and result_name(key, suffix) in archive):
+            done += 1
+            continue
+
+        stored = stored_result(store_dir, key, suffix)
+        if stored is None and name in present and valid(Path(results_dir, name)):
+            store_result(store_dir, key, Path(results_dir, name), suffix)
+            stored = stored_result(store_dir, key, suffix)
+
+        if name not in present and stored is not None:
+            shutil.copyfile(stored, Path(results_dir, name))
+            present.add(name)
+
+        done += name in present
+    return done
+
+
+class Archive:
+    """Uncompressed tar holding many small files, with an offset index.
+
+    The index (name: data offset, size, sha256) is kept next to the tar,
+    so that any file is read with a single seek. A file added again keeps
+    the last version, and is not appended at all if its content has not
+    changed. The older versions stay in the tar until it is compacted,
+    which close does once they take more than half of it.
+    """
+
+    def __init__(self, path, batch=1000):
+        self.path = Path(path)
+        self.index_path = Path(str(path) + '.json')
+        self.batch = batch
+        self.pending = {}  # name: data
+        self.index = {}
+        if self.index_path.exists():
+            with open(self.index_path) as f:
+                self.index = json.load(f)
+
+    def __contains__(self, name):
+        return name in self.index or name in self.pending
+
+    def add(self, name, text):
+        """Add a file (text or bytes) to the archive."""
+        data = text.encode() if isinstance(text, str) else text
+        if name in self.pending:
+            if self.pending[name] == data:
+                return
+        elif name in self.index:
+            entry = self.index[name]  # older indexes have no hash
+            known = entry[2] if len(entry) > 2 else content_hash(self.read(name))
+            if known == content_hash(data):
+                return  # the tar only grows with new content
+        self.pending[name] = data
+        if len(self.pending) >= self.batch:
+            self.flush()
+
+    def add_file(self, file_path, name=None):
+        """Add an existing file to the archive."""
+        with open(file_path, 'rb') as f:
+            self.add(name or os.path.basename(file_path), f.read())
+
+    def flush(self):
+        """Append the pending files to the tar and update the index."""
+        if len(self.pending) == 0:
+            return
+        with tarfile.open(self.path, 'a' if self.path.exists() else 'w') as tar:
+            for name, data in self.pending.items():
+                self.index[name] = add_member(tar, name, data)
+        self.pending = {}
+        self.write_index()
+
+    def write_index(self):
+        """Write the index next to the tar."""
+        with open(self.index_path, 'w') as f:
+            json.dump(self.index, f)
+
+    def close(self):
+        """Write what is left, then compact the tar if needed."""
+        self.flush()
+        self.compact()
+
+    def compact(self, threshold=0.5):
+        """Rewrite the tar with the last version of every file only.
+
+        It is only done when the older versions take more than "threshold"
+        of the tar. Returns True if the tar has been rewritten.
+        """
+        self.flush()
+        if not self.path.exists():
+            return False
+        size = os.path.getsize(self.path)
+        live = sum(tarfile.BLOCKSIZE + -(-entry[1]//tarfile.BLOCKSIZE)*tarfile.BLOCKSIZE
+                   for entry in self.index.values())  # header and data blocks
+        if size - live <= max(threshold*size, tarfile.RECORDSIZE):
+            return False
+
+        temporary = Path(str(self.path) + '.tmp')
+        with open(self.path, 'rb') as source, tarfile.open(temporary, 'w') as tar:
+            for name, (offset, length, *_) in self.index.items():
+                source.seek(offset)
+                self.index[name] = add_member(tar, name, source.read(length))
+        os.replace(temporary, self.path)
+        self.write_index()
+        return True
+
+    def read(self, name):
+        """Read one file of the archive (bytes)."""
+        if name in self.pending:
+            return self.pending[name]
+        offset, size = self.index[name][:2]
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            return f.read(size)
+
+    def open(self, name):
+        """File object to read one file of the archive."""
+        return io.BytesIO(self.read(name))
+
+    def extract(self, name, directory):
+        """Write one file of the archive into a directory."""
+        with open(Path(directory, name), 'wb') as f:
+            f.write(self.read(name))
+
+
+def add_member(tar, name, data):
+    """Append a file to an open tar, returns its index entry."""
+    info = tarfile.TarInfo(name)
+    info.size = len(data)
+    tar.addfile(info, io.BytesIO(data))
+    # data starts where its padded blocks start
+    padded = -(-info.size//tarfile.BLOCKSIZE)*tarfile.BLOCKSIZE
+    return [tar.offset - padded, info.size, content_hash(data)]
+
+
+def read_manifest(input_dir):
+    """Read the manifest of a campaign, None if there is none."""
+    file_path = Path(input_dir, 'manifest.json')
+    if not file_path.exists():
+        return None
+    with open(file_path) as f:
+        return json.load(f)
+
+
+def write_manifest(input_dir, parameters, run_keys, status):
+    """Write the manifest: parameters, input key and status of every run."""
+    runs = [{'run': run, 'parameters': list(parameters[run]),
+             'key': key, 'status': status[run]}
+            for run, key in enumerate(run_keys)]
+
+    temporary = Path(input_dir, 'manifest.tmp')
+    with open(temporary, 'w') as f:
+        json.dump({'runs': runs}, f, indent=1)
+    os.replace(temporary, Path(input_dir, 'manifest.json'))
+
+
+def run_status(sources, shape, running=False):
+    """Status of every run from its result: done, pending or failed."""
+    return ['done' if valid_result(source, shape)
+            else 'pending' if running else 'failed'
+            for source in sources]
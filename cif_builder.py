@@ -42,15 +42,16 @@ Add-on for the generation of a cif file.
 
 import os
 import sys
-from PyQt5 import QtGui, uic # v5.14.4
+from PyQt5 import QtGui # v5.14.4
 from PyQt5.QtWidgets import QApplication, QTableWidgetItem  # v5.14.4
-from pathlib import Path
 import CifFile # v4.4.5
 import pyxtal # v0.5.5
 
+# Own modules, to be placed in same folder:
+import ui_cache
+
 home_cwd = os.getcwd()  # current cwd
-Ui_path = Path(home_cwd, 'builder.ui')
-Ui_myWindow_base, Ui_myWindow_form = uic.loadUiType(Ui_path)
+Ui_myWindow_base, Ui_myWindow_form = ui_cache.loadUiType('builder.ui')
 
 class builderScreen (Ui_myWindow_base, Ui_myWindow_form):
     """Main GUI."""
@@ -0,0 +1,201 @@
+"""
+BSD 3-Clause License.
+
+Copyright (c) 2022 CNRS - Université de Strasbourg.
+All rights reserved.
+
+Author : [Antonio Pena Corredor] [antonio.penacorredor@ipcmss.unistra.fr]
+
+This software is a reflection choice framework for Resonant Elastic X-ray Scattering.
+The program consists of different ".py" modules and a "GUI.ui" graphic interface.
+- main.py: backbone, direct exchange with interface.
+- intensity module.py: module for the calculation of the reflection intensities.
+- sensitivity module.py: module for the calculation of the reflection sensitivities.
+- campaign module.py: module for the bookkeeping of the FDMNES campaigns.
+- convolution module.py: module for the broadening of the FDMNES spectra.
+- surrogate module.py: module for the surrogate model of the FDMNES intensities.
+- cube module.py: module for the storage of the energy resolved results.
+- element module.py: module for the element data (Element_data folder).
+- cif module.py: module for the reading of .cif files.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+* Redistributions of source code must retain the above copyright notice, this
+  list of conditions and the following disclaimer.
+
+* Redistributions in binary form must reproduce the above copyright notice,
+  this list of conditions and the following disclaimer in the documentation
+  and/or other materials provided with the distribution.
+
+* Neither the name of the copyright holder nor the names of its
+  contributors may be used to endorse or promote products derived from
+  this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+The program has been coded and tested on python 3.9
+The version is indicated for those modules not included in the standard Python library
+
+Module for the reading of .cif files.
+
+Only the tags used by get_crystal_info (cell, space group, symmetry
+operations and atom sites) are taken from the first data block, and the
+file is read line by line until all of them are found, so that the
+reflection data often appended to .cif files is not parsed. Files the
+reader does not understand are passed to PyCifRW.
+"""
+import re
+
+# tags taken from the file, the first group is needed
+REQUIRED = ({'_cell_length_a', '_cell_length_b', '_cell_length_c',
+             '_cell_angle_alpha', '_cell_angle_beta', '_cell_angle_gamma',
+             '_symmetry_space_group_name_h-m',
+             '_atom_site_label', '_atom_site_fract_x', '_atom_site_fract_y',
+             '_atom_site_fract_z'})
+SYMMETRY = ('_space_group_symop_operation_xyz', '_symmetry_equiv_pos_as_xyz')
+OPTIONAL = {'_space_group_it_number', '_atom_site_occupancy'}
+WANTED = REQUIRED | set(SYMMETRY) | OPTIONAL
+
+# quoted strings end at a quote followed by a blank
+TOKEN = re.compile(r"""'(.*?)'(?=\s|$)|"(.*?)"(?=\s|$)|(\S+)""")
+
+
+class CifBlock(dict):
+    """Tags of a data block, case insensitive as in PyCifRW."""
+
+    def __getitem__(self, tag):
+        return dict.__getitem__(self, tag.lower())
+
+    def __contains__(self, tag):
+        return dict.__contains__(self, tag.lower())
+
+    def keys(self):
+        return list(dict.keys(self))
+
+
+class CifData(dict):
+    """Data blocks of a file, CIF[CIF.keys()[0]] as in PyCifRW."""
+
+    def keys(self):
+        return list(dict.keys(self))
+
+
+def tokens(lines, skip):
+    """Split the lines of a .cif file in (is_value, text) tokens.
+
+    While skip['values'] is set, lines of plain values are passed over
+    without splitting them (loops without wanted tags).
+    """
+    text_field = None
+    for line in lines:
+        if text_field is not None:  # inside a ; delimited text
+            if line.startswith(';'):
+                yield True, '\n'.join(text_field)
+                text_field = None
+            else:
+                text_field.append(line.rstrip('\r\n'))
+            continue
+        if line.startswith(';'):
+            text_field = [line[1:].rstrip('\r\n')]
+            continue
+        start = line.lstrip()[:5].lower()
+        if skip['values'] and not (start[:1] in ('_', '') or start in ('loop_', 'data_')):
+            continue
+
+        for match in TOKEN.finditer(line):
+            quoted = match.group(1) if match.group(1) is not None else match.group(2)
+            if quoted is not None:
+                yield True, quoted
+                continue
+            word = match.group(3)
+            if word.startswith('#'):  # comment until the end of the line
+                break
+            lowered = word.lower()
+            is_value = not (word.startswith('_') or lowered == 'loop_'
+                            or lowered.startswith('data_'))
+            yield is_value, word
+    if text_field is not None:
+        raise ValueError('Unterminated text field.')
+
+
+def read_subset(lines):
+    """Read the wanted tags of the first data block from the lines."""
+    block, name = CifBlock(), None
+    loop_tags, loop_values, tag = None, [], None
+    skip = {'values': False}
+
+    def close_loop():
+        """Keep the wanted columns of the loop being read."""
+        if loop_tags is None or skip['values']:
+            return
+        if len(loop_values) % len(loop_tags) != 0:
+            raise ValueError('Loop with missing values.')
+        for column, loop_tag in enumerate(loop_tags):
+            if loop_tag in WANTED:
+                block[loop_tag] = loop_values[column::len(loop_tags)]
+
+    def complete():
+        """Check if every needed tag has been read."""
+        return REQUIRED.issubset(block) and any(key in block for key in SYMMETRY)
+
+    for is_value, text in tokens(lines, skip):
+        if is_value:
+            if tag is not None:  # value of a single tag
+                if tag in WANTED:
+                    block[tag] = text
+                tag = None
+            elif loop_tags is not None:
+                loop_values.append(text)
+                skip['values'] = WANTED.isdisjoint(loop_tags)  # as hkl loops
+            else:
+                raise ValueError(f'Value "{text}" without tag.')
+            continue
+
+        lowered = text.lower()
+        if tag is not None:
+            raise ValueError(f'Tag {tag} without value.')
+        if loop_tags is not None and (loop_values or not lowered.startswith('_')):
+            close_loop()  # a new tag, loop or block ends the loop
+            loop_tags, loop_values = None, []
+            skip['values'] = False
+            if complete():
+                break  # the rest of the file is not needed
+
+        if lowered.startswith('data_'):
+            if name is not None:
+                break  # only the first data block
+            name = text[5:].lower()
+        elif lowered == 'loop_':
+            loop_tags = []
+        elif loop_tags is not None:
+            loop_tags.append(lowered)
+        else:
+            tag = lowered
+            if complete() and tag not in WANTED:
+                break
+    else:
+        close_loop()
+
+    if name is None or not complete():
+        raise ValueError('Missing data in the .cif file.')
+    return CifData({name: block})
+
+
+def read_cif(file_path):
+    """Read a .cif file, with PyCifRW if the fast reader cannot."""
+    try:
+        with open(file_path, errors='replace') as f:
+            return read_subset(f)
+    except ValueError:
+        import CifFile  # v4.4.5
+        return CifFile.ReadCif(str(file_path))
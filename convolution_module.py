@@ -0,0 +1,159 @@
+"""
+BSD 3-Clause License.
+
+Copyright (c) 2022 CNRS - Université de Strasbourg.
+All rights reserved.
+
+Author : [Antonio Pena Corredor] [antonio.penacorredor@ipcmss.unistra.fr]
+
+This software is a reflection choice framework for Resonant Elastic X-ray Scattering.
+The program consists of different ".py" modules and a "GUI.ui" graphic interface.
+- main.py: backbone, direct exchange with interface.
+- intensity module.py: module for the calculation of the reflection intensities.
+- sensitivity module.py: module for the calculation of the reflection sensitivities.
+- campaign module.py: module for the bookkeeping of the FDMNES campaigns.
+- convolution module.py: module for the broadening of the FDMNES spectra.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+* Redistributions of source code must retain the above copyright notice, this
+  list of conditions and the following disclaimer.
+
+* Redistributions in binary form must reproduce the above copyright notice,
+  this list of conditions and the following disclaimer in the documentation
+  and/or other materials provided with the distribution.
+
+* Neither the name of the copyright holder nor the names of its
+  contributors may be used to endorse or promote products derived from
+  this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+The program has been coded and tested on python 3.9
+The version is indicated for those modules not included in the standard Python library
+
+Module for the broadening of the FDMNES spectra.
+
+The raw (unconvoluted) outputs of FDMNES are read once and broadened for
+every reflection and run in a single matrix product, so that changing the
+broadening does not require new simulations.
+"""
+import numpy as np  # v1.21.5
+
+
+def read_raw(source):
+    """Read a raw FDMNES output.
+
+    Returns the energies, the column names and the data (column x energy)
+    after the energy. The header line is the one starting with "Energy".
+    """
+    if hasattr(source, 'read'):  # file object from an archive
+        lines = source.read().decode().splitlines()
+    else:
+        with open(source) as f:
+            lines = f.read().splitlines()
+
+    for row, line in enumerate(lines):
+        if line.split()[:1] and line.split()[0].lower() == 'energy':
+            break
+    else:
+        raise ValueError("No Energy column in the FDMNES output.")
+
+    names = lines[row].split()
+    data = np.loadtxt(lines[row + 1:], ndmin=2).T
+    if data.shape[0] != len(names):
+        raise ValueError("Incomplete FDMNES output.")
+    return data[0], names[1:], data[1:]
+
+
+def valid_raw(source, n_energies=None, n_ref=None):
+    """Check if a raw FDMNES output is complete.
+
+    With n_energies and n_ref, a file cut while being written (fewer
+    energy rows) or without every reflection is not valid either.
+    """
+    try:
+        energies, names, columns = read_raw(source)
+    except (OSError, ValueError, IndexError):
+        return False
+    if n_energies is not None and len(energies) != n_energies:
+        return False
+    return n_ref is None or columns.shape[0] >= 1 + n_ref  # xanes, then reflections
+
+
+def spectra_from_raw(columns, n_ref):
+    """Split the raw columns in the xanes and the reflection signals.
+
+    If the output has the real and imaginary amplitudes after the
+    intensities (3 columns per reflection), the complex amplitudes are
+    returned, to be broadened before squaring; else the intensities.
+    """
+    xanes = columns[0]
+    if columns.shape[0] - 1 >= 3*n_ref:
+        amplitudes = columns[1 + n_ref:1 + 3*n_ref]
+        return xanes, amplitudes[0::2] + 1j*amplitudes[1::2]
+    return xanes, columns[1:1 + n_ref]
+
+
+def lorentzian_width(energies, gamma_hole, gamma_max, E_start=0, E_cent=30, E_larg=30):
+    """Energy dependent width, arctangent model (as FDMNES does).
+
+    The width is gamma_hole below E_start and rises to gamma_max above it.
+    """
+    e = np.maximum(energies - E_start, 1e-6)/E_cent
+    width = gamma_max*(0.5 + np.arctan(np.pi/3*gamma_max/E_larg*(e - 1/e**2))/np.pi)
+    return gamma_hole + np.where(energies > E_start, width, 0)
+
+
+def broadening_matrix(energies, gamma_hole=1.0, gamma_max=0.0, E_start=0,
+                      sigma=0.0):
+    """Matrix of the Lorentzian (and Gaussian) broadening over an energy grid.
+
+    Each row gives the weights of the input energies for one output energy;
+    rows are normalised, so the borders of the grid do not lose intensity.
+    The Gaussian, of standard deviation sigma, is applied after.
+    """
+    energies = np.asarray(energies, dtype=float)
+    widths = np.gradient(energies) if len(energies) > 1 else np.ones(1)
+    difference = energies[:, None] - energies[None, :]
+
+    half = lorentzian_width(energies, gamma_hole, gamma_max, E_start)[:, None]/2
+    lorentz = half/(difference**2 + half**2)*widths[None, :]
+    lorentz /= lorentz.sum(axis=1, keepdims=True)
+
+    if sigma <= 0:
+        return lorentz, None
+    gauss = np.exp(-difference**2/(2*sigma**2))*widths[None, :]
+    gauss /= gauss.sum(axis=1, keepdims=True)
+    return lorentz, gauss
+
+
+def convolve_spectra(signals, lorentz, gauss=None):
+    """Broaden many spectra at once (... x energy).
+
+    Complex amplitudes are broadened and then squared into intensities.
+    """
+    shape = signals.shape
+    flat = signals.reshape(-1, shape[-1]) @ lorentz.T  # one product for all
+    if np.iscomplexobj(flat):
+        flat = np.abs(flat)**2
+    if gauss is not None:
+        flat = flat @ gauss.T
+    return flat.reshape(shape)
+
+
+def write_conv(file_path, energies, xanes, intensities, names):
+    """Write a result in the layout of the FDMNES _conv files."""
+    header = '    Energy    <xanes>  ' + '  '.join(names)
+    np.savetxt(file_path, np.vstack((energies, xanes, intensities)).T,
+               fmt='%.6e', header=header, comments='')
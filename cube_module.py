@@ -0,0 +1,160 @@
+"""
+BSD 3-Clause License.
+
+Copyright (c) 2022 CNRS - Université de Strasbourg.
+All rights reserved.
+
+Author : [Antonio Pena Corredor] [antonio.penacorredor@ipcmss.unistra.fr]
+
+This software is a reflection choice framework for Resonant Elastic X-ray Scattering.
+The program consists of different ".py" modules and a "GUI.ui" graphic interface.
+- main.py: backbone, direct exchange with interface.
+- intensity module.py: module for the calculation of the reflection intensities.
+- sensitivity module.py: module for the calculation of the reflection sensitivities.
+- campaign module.py: module for the bookkeeping of the FDMNES campaigns.
+- convolution module.py: module for the broadening of the FDMNES spectra.
+- surrogate module.py: module for the surrogate model of the FDMNES intensities.
+- cube module.py: module for the storage of the energy resolved results.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+* Redistributions of source code must retain the above copyright notice, this
+  list of conditions and the following disclaimer.
+
+* Redistributions in binary form must reproduce the above copyright notice,
+  this list of conditions and the following disclaimer in the documentation
+  and/or other materials provided with the distribution.
+
+* Neither the name of the copyright holder nor the names of its
+  contributors may be used to endorse or promote products derived from
+  this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+The program has been coded and tested on python 3.9
+The version is indicated for those modules not included in the standard Python library
+
+Module for the storage of the energy resolved results.
+
+The intensities of a campaign (reflection x energy x run) are kept in a
+compressed npz file, cut in chunks of reflections and energies, together
+with the per energy statistics and the metadata. The reader loads only the
+chunks needed for a reflection or an energy window.
+"""
+import json
+import zipfile
+import numpy as np  # v1.21.5
+
+
+def write_member(archive, name, array):
+    """Write one array in an open npz (zip) file, as np.savez does."""
+    with archive.open(name + '.npy', 'w', force_zip64=True) as f:
+        np.lib.format.write_array(f, np.asanyarray(array), allow_pickle=False)
+
+
+def write_cube(file_path, intensity_matrix, energies, reflections, parameters,
+               labels, chunks=(8, 64), runs=None):
+    """Write the intensity cube and its metadata in chunks.
+
+    The cube can be a memory map, it is read one chunk at a time and each
+    chunk is compressed into the file right away, so the cube never has to
+    fit in RAM. Only the given runs are written, all if None. The mean and
+    variance over the runs (reflection x energy) are stored too.
+    """
+    n_ref, n_energy, n_runs = intensity_matrix.shape
+    if runs is not None:
+        n_runs = len(runs)
+    metadata = {'shape': [n_ref, n_energy, n_runs], 'chunks': list(chunks),
+                'reflections': [str(reflection) for reflection in reflections],
+                'labels': list(labels)}
+
+    mean = np.zeros((n_ref, n_energy))
+    variance = np.zeros((n_ref, n_energy))
+    with zipfile.ZipFile(file_path, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for r0 in range(0, n_ref, chunks[0]):
+            for e0 in range(0, n_energy, chunks[1]):
+                block = np.asarray(intensity_matrix[r0:r0 + chunks[0], e0:e0 + chunks[1]])
+                if runs is not None:
+                    block = block[:, :, runs]
+                write_member(archive, f'r{r0//chunks[0]}_e{e0//chunks[1]}', block)
+                mean[r0:r0 + chunks[0], e0:e0 + chunks[1]] = block.mean(axis=2)
+                variance[r0:r0 + chunks[0], e0:e0 + chunks[1]] = block.var(axis=2)
+
+        write_member(archive, 'metadata', np.array(json.dumps(metadata)))
+        write_member(archive, 'energies', energies)
+        write_member(archive, 'parameters', parameters)
+        write_member(archive, 'mean', mean)
+        write_member(archive, 'variance', variance)
+
+
+class CubeReader:
+    """Lazy access to a cube written by write_cube."""
+
+    def __init__(self, file_path):
+        self.file = np.load(file_path)
+        metadata = json.loads(str(self.file['metadata']))
+        self.shape = tuple(metadata['shape'])
+        self.chunks = tuple(metadata['chunks'])
+        self.reflections = metadata['reflections']
+        self.labels = metadata['labels']
+        self.energies = self.file['energies']
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        """Close the file."""
+        self.file.close()
+
+    @property
+    def parameters(self):
+        """Factors of the refined parameters (run x parameter)."""
+        return self.file['parameters']
+
+    def statistics(self):
+        """Mean and variance over the runs (reflection x energy)."""
+        return self.file['mean'], self.file['variance']
+
+    def read(self, reflections=None, E_min=None, E_max=None):
+        """Intensities (reflection x energy x run) of some reflections in
+        an energy window; only the chunks covering them are loaded.
+        """
+        reflections = np.arange(self.shape[0]) if reflections is None else np.atleast_1d(reflections)
+        in_window = np.ones(len(self.energies), dtype=bool)
+        if E_min is not None:
+            in_window &= self.energies >= E_min
+        if E_max is not None:
+            in_window &= self.energies <= E_max
+        points = np.flatnonzero(in_window)
+
+        cube = np.zeros((len(reflections), len(points), self.shape[2]))
+        for r_chunk in np.unique(reflections//self.chunks[0]):
+            rows = np.flatnonzero(reflections//self.chunks[0] == r_chunk)
+            for e_chunk in np.unique(points//self.chunks[1]):
+                columns = np.flatnonzero(points//self.chunks[1] == e_chunk)
+                block = self.file[f'r{r_chunk}_e{e_chunk}']
+                cube[np.ix_(rows, columns)] = block[np.ix_(reflections[rows] % self.chunks[0],
+                                                           points[columns] % self.chunks[1])]
+        return cube
+
+    def reflection(self, index):
+        """Intensities (energy x run) of one reflection."""
+        return self.read(index)[0]
+
+    def window(self, E_min, E_max):
+        """Energies and intensities (reflection x energy x run) in a window."""
+        in_window = (self.energies >= E_min) & (self.energies <= E_max)
+        return self.energies[in_window], self.read(None, E_min, E_max)
@@ -0,0 +1,147 @@
+"""
+BSD 3-Clause License.
+
+Copyright (c) 2022 CNRS - Université de Strasbourg.
+All rights reserved.
+
+Author : [Antonio Pena Corredor] [antonio.penacorredor@ipcmss.unistra.fr]
+
+This software is a reflection choice framework for Resonant Elastic X-ray Scattering.
+The program consists of different ".py" modules and a "GUI.ui" graphic interface.
+- main.py: backbone, direct exchange with interface.
+- intensity module.py: module for the calculation of the reflection intensities.
+- sensitivity module.py: module for the calculation of the reflection sensitivities.
+- campaign module.py: module for the bookkeeping of the FDMNES campaigns.
+- convolution module.py: module for the broadening of the FDMNES spectra.
+- surrogate module.py: module for the surrogate model of the FDMNES intensities.
+- cube module.py: module for the storage of the energy resolved results.
+- element module.py: module for the element data (Element_data folder).
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+* Redistributions of source code must retain the above copyright notice, this
+  list of conditions and the following disclaimer.
+
+* Redistributions in binary form must reproduce the above copyright notice,
+  this list of conditions and the following disclaimer in the documentation
+  and/or other materials provided with the distribution.
+
+* Neither the name of the copyright holder nor the names of its
+  contributors may be used to endorse or promote products derived from
+  this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+The program has been coded and tested on python 3.9
+The version is indicated for those modules not included in the standard Python library
+
+Module for the element data.
+
+The atomic numbers, weights and edges (Element_data/elements.dat) and the
+Thomson scattering factors (Element_data/it92.dat) are kept in arrays,
+loaded the first time they are needed. Elements are found from CIF labels
+such as "Mn1", "O2-" or "Fe3+".
+"""
+import re
+from functools import lru_cache
+from pathlib import Path
+import numpy as np  # v1.21.5
+
+data_dir = Path(__file__).resolve().parent / 'Element_data'
+
+# element letters, then the site number or the charge of the label
+LABEL = re.compile(r'([A-Za-z]{1,2})(\d*)([+-]?)')
+
+# columns of elements.dat after the symbol
+Z, WEIGHT, K, L1, L2, L3 = range(6)
+
+
+@lru_cache(maxsize=None)
+def load_table(name):
+    """Symbols, values and symbol -> row lookup of a data file."""
+    with open(data_dir / name) as f:
+        rows = [line.split() for line in f if line.strip() and not line.startswith('#')]
+
+    values = np.array([row[1:] for row in rows], dtype=float)
+    values.setflags(write=False)  # shared between threads
+    return values, {row[0]: index for index, row in enumerate(rows)}
+
+
+@lru_cache(maxsize=None)
+def parse_label(label):
+    """Element symbol and charge ('' if neutral, e.g. '2+') of a CIF label."""
+    match = LABEL.match(label.strip())
+    if match is None:
+        raise KeyError(f'No element in the label "{label}".')
+    letters, number, sign = match.groups()
+
+    _, lookup = load_table('elements.dat')
+    symbol = letters[0].upper() + letters[1:].lower()
+    if symbol not in lookup:  # "OW1", "Ca" written "CA"... first letter only
+        symbol = symbol[0]
+    if symbol not in lookup:
+        raise KeyError(f'Unknown element in the label "{label}".')
+
+    charge = (number or '1') + sign if sign and len(symbol) == len(letters) else ''
+    return symbol, charge
+
+
+def index(labels):
+    """Rows of elements.dat for one label or a list of them."""
+    _, lookup = load_table('elements.dat')
+    if isinstance(labels, str):
+        return lookup[parse_label(labels)[0]]
+    return np.array([lookup[parse_label(label)[0]] for label in labels], dtype=int)
+
+
+def atomic_number(labels):
+    """Atomic number of one label or of a list of them."""
+    values, _ = load_table('elements.dat')
+    return values[index(labels), Z].astype(int)
+
+
+def edge(labels, column=K):
+    """Absorption edge (eV) of one label or of a list of them."""
+    values, _ = load_table('elements.dat')
+    return values[index(labels), column]
+
+
+def properties(label):
+    """Atomic number, weight and K, L1, L2, L3 edges of an element."""
+    values, _ = load_table('elements.dat')
+    row = values[index(label)]
+    return (int(row[Z]), *(float(value) for value in row[1:]))
+
+
+def it92(label, valence=0):
+    """Coefficients a, b, c of the Thomson factor of an element or ion.
+
+    The charge is taken from the label ("Fe3+") or from the valence; the
+    neutral element is used if the ion is not tabulated.
+    """
+    values, lookup = load_table('it92.dat')
+    if label in lookup and valence == 0:  # also the special entries as "Sival"
+        row = values[lookup[label]]
+    else:
+        symbol, charge = parse_label(label)
+        if valence != 0:
+            charge = f"{abs(valence)}{'+' if valence > 0 else '-'}"
+        row = values[lookup.get(symbol + charge, lookup[symbol])]
+    return row[:4], row[4:8], row[8]
+
+
+def thomson(label, sin_2, valence=0):
+    """Thomson factor at (sin(theta)/lambda)**2, a number or an array."""
+    a, b, c = it92(label, valence)
+    sin_2 = np.asarray(sin_2, dtype=float)
+    return c + np.sum(a*np.exp(-np.multiply.outer(sin_2, b)), axis=-1)
@@ -46,26 +46,27 @@ Main module, backbone.
 import os
 import sys
 import numpy as np  # v1.21.5
-import math
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FC  # v3.5.1
-from PyQt5 import QtCore, QtGui, uic, QtWidgets  # v5.14.4
+from PyQt5 import QtCore, QtGui, QtWidgets  # v5.14.4
 from PyQt5.QtWidgets import QApplication, QTableWidgetItem  # v5.14.4
 from pathlib import Path
-import promptlib  # v3.0.20
-import threading  # v4.1.0
-import matplotlib.pyplot as plt  # v.3.5.1
-import seaborn as sns # v0.12.1
-import CifFile # v4.4.5
-import pyxtal # v0.5.5
 
 # Own modules, to be placed in same folder:
 import intensity_module as im
 import sensitivity_module as sm
+import cif_module as cif
+import session_module as ss
+import table_module as tm
+import ui_cache
 
 
 home_cwd = os.getcwd()  # current cwd
-Ui_path = Path(home_cwd, 'GUI.ui')
-Ui_myWindow_base, Ui_myWindow_form = uic.loadUiType(Ui_path)
+
+# widgets saved with the session
+SESSION_LINES = ('cifnameLine', 'maxhklLine', 'e_startLine', 'e_endLine', 'e_stepLine',
+                 'percentLine', 'nsimLine', 'toleranceLine')
+SESSION_CHECKBOXES = ('forbiddenCheckbox', 'coupleCheckbox', 'archiveCheckbox',
+                      'convolutionCheckbox', 'normalisedCheckbox')
+Ui_myWindow_base, Ui_myWindow_form = ui_cache.loadUiType('GUI.ui')
 
 
 class Screen (Ui_myWindow_base, Ui_myWindow_form):
@@ -81,13 +82,44 @@ class Screen (Ui_myWindow_base, Ui_myWindow_form):
 
         # Widgets:
         self.loadcifButton.clicked.connect(self.load_cif)
+        self.restoreButton.clicked.connect(self.restore_session)
         self.updateButton.clicked.connect(self.update_values)
         self.fetchreflectionsButton.clicked.connect(self.fetch_reflections)
         self.launchButton.clicked.connect(self.launchfunction)
         self.sensitivityButton.clicked.connect(self.sencalcul)
+        self.resumeButton.clicked.connect(self.resume_fdmnes)
+        self.rebroadenButton.clicked.connect(self.rebroaden)
+
+        # reflections shown through a model, sorted and filtered with numpy
+        self.reflectionModel = tm.ReflectionModel(self)
+        self.reflectionTable.setModel(self.reflectionModel)
+        self.reflectionTable.verticalHeader().setSectionResizeMode(
+            QtWidgets.QHeaderView.Fixed)  # rows are never measured one by one
+        self.reflectionTable.horizontalHeader().setSortIndicator(-1, QtCore.Qt.AscendingOrder)
+        self.reflectionTable.setSortingEnabled(True)
+        self.reflectionFilterLine.textChanged.connect(self.reflectionModel.set_filter)
+
+        # heavy stages run in a worker, followed from the status bar:
+        self.worker = None
+        self.monitor = None  # early stop of FDMNES
+        self.monitorWorker = None  # reads the new results for the monitor
+        self.progressBar = QtWidgets.QProgressBar()
+        self.progressBar.setMaximumWidth(250)
+        self.cancelButton = QtWidgets.QPushButton('Cancel')
+        self.cancelButton.clicked.connect(self.cancel)
+        self.statusbar.addPermanentWidget(self.progressBar)
+        self.statusbar.addPermanentWidget(self.cancelButton)
+        self.progressBar.hide()
+        self.cancelButton.hide()
+
+        # FDMNES runs on its own, its results are counted from time to time
+        self.fdmnesTimer = QtCore.QTimer(self)
+        self.fdmnesTimer.setInterval(2000)
+        self.fdmnesTimer.timeout.connect(self.fdmnes_progress)
 
     def load_cif(self):
         """Call when button "Load .cif" is called."""
+        import promptlib  # v3.0.20
         prompter = promptlib.Files()  # calls for directory
         file_cif = prompter.file()  # calles for file
 
@@ -99,10 +131,15 @@ class Screen (Ui_myWindow_base, Ui_myWindow_form):
         # write file name in correct line
         self.cifnameLine.setText(os.path.basename(file_cif))
 
-        # load crystal info
-        cf_object = CifFile.ReadCif(file_cif)
+        # load crystal info, PyCifRW only for unusual files
+        cf_object = cif.read_cif(file_cif)
         get_crystal_info(crystal, cf_object)
 
+        self.show_crystal()
+        self.save_session()
+
+    def show_crystal(self):
+        """Call to show the crystal parameters and atoms."""
         # Crystal variables:
         self.line_comb = ((self.aLine, crystal.a),
                           (self.bLine, crystal.b),
@@ -155,23 +192,18 @@ class Screen (Ui_myWindow_base, Ui_myWindow_form):
         # for the max value of h, k, l:
         crystal.maxhkl = int(self.maxhklLine.text())
 
-        thread_FR = myThread(fun_fetch_reflections, crystal)
-
-        thread_FR.start()
-        thread_join(thread_FR)  # we join the thread to the rest
-        #
-        reflections = thread_FR.output  # we take the output away
-        thread_FR.stop()
+        self.start_worker(fun_fetch_reflections, 'Calculating the reflections...',
+                          self.reflections_fetched)
 
-        row = 0
-        self.reflectionTable.setRowCount(len(reflections))
-        for reflection in reflections:
-            self.reflectionTable.setItem(row, 0, QtWidgets.QTableWidgetItem
-                                         (str(reflection[0]).replace(',', '')))
-            self.reflectionTable.setItem(row, 1, QtWidgets.QTableWidgetItem
-                                         (str(reflection[1])))
-            row += 1
+    def reflections_fetched(self, reflections):
+        """Call when the reflections have been calculated."""
+        self.show_reflections(reflections)
+        self.save_session()
 
+    def show_reflections(self, reflections):
+        """Call to show the reflections in their table."""
+        angles, distances = im.reflection_geometry(crystal)
+        self.reflectionModel.set_reflections(reflections, angles, distances)
 
     def make_refinement_buttons(self):
         """Call to make refinement buttons."""
@@ -221,17 +253,89 @@ class Screen (Ui_myWindow_base, Ui_myWindow_form):
                 raise ValueError("No edges have been chosen.")
 
     def fetch_sensitivity(self):
-        """Call to fetch the sensitivity."""
-        thread_FS = myThread(fun_fetch_sensitivity, crystal)
-        thread_FS.start()
-        thread_join(thread_FS)  # we join the thread to the rest
-
-        crystal.filenumber = int(thread_FS.output)  # we take the output away
-        thread_FS.stop()
-
-    def launch_fdmnes(self):
-        """Call to launch FDMNES."""
-        fun_run_fdmnes()
+        """Call to fetch the sensitivity, FDMNES is launched after."""
+        self.start_worker(fun_fetch_sensitivity, 'Writing the FDMNES inputs...',
+                          self.launch_fdmnes)
+
+    def launch_fdmnes(self, filenumber):
+        """Call once FDMNES has been launched by the worker."""
+        crystal.filenumber = int(filenumber)
+        self.save_session()
+        self.follow_fdmnes()
+
+    def resume_fdmnes(self):
+        """Call to relaunch FDMNES for the missing or failed runs."""
+        if getattr(crystal, 'run_keys', None) is None:
+            self.statusbar.showMessage('No campaign to resume, launch a simulation first.')
+            return
+        if self.fdmnesTimer.isActive():
+            self.statusbar.showMessage('FDMNES is still running.')
+            return
+        tolerance = self.toleranceLine.text().strip()
+        crystal.tolerance = float(tolerance) if tolerance else None
+        self.start_worker(fun_resume_campaign, 'Looking for the missing runs...',
+                          self.follow_fdmnes)
+
+    def follow_fdmnes(self, a=None):
+        """Call to follow FDMNES once it has been launched."""
+        if crystal.process is None:
+            self.statusbar.showMessage('All the results were known already.')
+            return
+
+        # early stop, the ranking is checked as the results arrive
+        self.monitor = None
+        message = 'FDMNES is running...'
+        if crystal.tolerance is not None and not sm.early_stop_allowed(crystal):
+            message = f'No early stop with the {crystal.sampling} design, FDMNES is running...'
+        elif crystal.tolerance is not None:
+            self.monitor = sm.CampaignMonitor(crystal, crystal.tolerance)
+            self.checked = 0
+
+        self.progressBar.setRange(0, len(crystal.jobs))
+        self.progressBar.setValue(0)
+        self.progressBar.show()
+        self.cancelButton.show()
+        self.statusbar.showMessage(message)
+        self.fdmnesTimer.start()
+
+    def fdmnes_progress(self):
+        """Call to follow the runs finished by FDMNES."""
+        done, total = sm.fdmnes_progress(crystal)
+        self.progressBar.setValue(done)
+        running = crystal.process is not None and crystal.process.poll() is None
+
+        # the results are only read when a batch of them is new, in a worker
+        reading = self.monitorWorker is not None and self.monitorWorker.isRunning()
+        if (self.monitor is not None and running and not reading
+                and done - self.checked >= self.monitor.batch):
+            self.checked = done
+            self.monitorWorker = Worker(fun_monitor_step, self.monitor, parent=self)
+            self.monitorWorker.done.connect(self.ranking_checked)
+            self.monitorWorker.failed.connect(self.worker_failed)
+            self.monitorWorker.start()
+
+        if not running:
+            self.fdmnesTimer.stop()
+            self.progressBar.hide()
+            self.cancelButton.hide()
+            if getattr(crystal, 'stopped_early', False) and self.monitor is not None:
+                report = self.monitor.report()
+                self.statusbar.showMessage(f"Ranking converged, {report['runs done']} of "
+                                           f"{report['runs planned']} runs done.")
+            else:
+                self.statusbar.showMessage(f'FDMNES finished, {done} of {total} runs done.')
+
+    def ranking_checked(self, output):
+        """Call when the monitor has read the new results."""
+        converged, results = output
+        if results is not None and self.fdmnesTimer.isActive():  # the best so far
+            top = ', '.join(results.sort_values('Weights', ascending=False)['Reflections'][:5])
+            self.statusbar.showMessage(f'FDMNES is running, {self.monitor.accumulator.count} '
+                                       f'runs read, provisional best reflections: {top}')
+        if converged and crystal.process is not None and crystal.process.poll() is None:
+            sm.stop_fdmnes(crystal.process)
+            crystal.stopped_early = True
+            self.fdmnes_progress()
 
     def launchfunction(self):
         """Call to launch the function."""
@@ -243,32 +347,193 @@ class Screen (Ui_myWindow_base, Ui_myWindow_form):
         # to see if parameters should be coupled:
         crystal.coupled = self.coupleCheckbox.isChecked()
 
+        # inputs and results packed in single files:
+        crystal.archive = self.archiveCheckbox.isChecked()
+
+        # raw spectra broadened by the program, not by FDMNES:
+        crystal.python_convolution = self.convolutionCheckbox.isChecked()
+
         # number of simulations to perform:
         crystal.nsim = float(self.nsimLine.text())
 
+        # early stop once the ranking does not change anymore, empty to run all
+        tolerance = self.toleranceLine.text().strip()
+        crystal.tolerance = float(tolerance) if tolerance else None
+        crystal.stopped_early = False  # set again if FDMNES is stopped
+
+        # how the parameters are sampled, same order as in designCombo:
+        crystal.design = ('combinations', 'oat', 'central', 'lhs', 'sobol',
+                          'halton', 'saltelli')[self.designCombo.currentIndex()]
+
         self.refinement_checks()  # checks the checked boxes
-        self.fetch_sensitivity()  # launches for sensitivity calculation
-        self.launch_fdmnes()  # launches FDMNES
+        self.fetch_sensitivity()  # inputs, then FDMNES is launched
 
     def sencalcul(self):
         """Call to calculate the intensity."""
-        thread_SC = myThread(fun_sen_calcul, crystal)
-        thread_SC.start()
-        thread_join(thread_SC)  # we join the thread to the rest
-
-        thread_SC.stop()
-
+        self.start_worker(fun_sen_calcul, 'Calculating the sensitivities...',
+                          self.results_ready)
+
+    def rebroaden(self):
+        """Call to broaden the raw spectra again, with other widths."""
+        if not getattr(crystal, 'python_convolution', False) or not hasattr(crystal, 'filenumber'):
+            self.statusbar.showMessage('Only a campaign broadened by the program can be broadened again.')
+            return
+        broadening = {**sm.BROADENING, **getattr(crystal, 'broadening', {})}
+        for name, label in (('gamma_hole', 'Core-hole width (eV):'),
+                            ('gamma_max', 'Maximum width (eV):'),
+                            ('sigma', 'Gaussian width (eV):')):
+            value, ok = QtWidgets.QInputDialog.getDouble(self, 'inserexs', label,
+                                                         broadening[name], 0, 100, 2)
+            if not ok:
+                return
+            broadening[name] = value
+        crystal.broadening = broadening
+        self.start_worker(fun_rebroaden, 'Broadening the spectra again...', self.results_ready)
+
+    def results_ready(self, a=None):
+        """Call when the sensitivities have been calculated."""
         self.representation()
-
-    def representation(self):
-        """Call to do final plot."""
+        self.save_session()
+
+    def start_worker(self, function, message, on_done):
+        """Run a heavy stage in a worker thread, the window stays responsive.
+
+        on_done receives the output of the function in the GUI thread.
+        """
+        if self.worker is not None and self.worker.isRunning():
+            self.statusbar.showMessage('Wait until the running step is done.')
+            return
+
+        self.worker = Worker(function, crystal, message, self)
+        self.worker.done.connect(on_done)
+        self.worker.failed.connect(self.worker_failed)
+        self.worker.finished.connect(self.worker_finished)
+        self.worker.progress.connect(self.worker_progress)
+
+        self.progressBar.setRange(0, 0)  # busy, no known length
+        self.progressBar.show()
+        self.cancelButton.show()
+        self.statusbar.showMessage(message)
+        self.worker.start()
+
+    def worker_progress(self, percent):
+        """Call when the worker reports its progress."""
+        self.progressBar.setRange(0, 100)
+        self.progressBar.setValue(percent)
+
+    def worker_finished(self):
+        """Call when a worker is over, done, failed or cancelled."""
+        if not self.fdmnesTimer.isActive():
+            self.progressBar.hide()
+            self.cancelButton.hide()
+        # the message of the step, unless on_done has shown another one
+        if (self.worker is not None and not self.worker.cancelled
+                and self.statusbar.currentMessage() == self.worker.message):
+            self.statusbar.clearMessage()
+
+    def worker_failed(self, message):
+        """Call when a worker raised an error."""
+        QtWidgets.QMessageBox.warning(self, 'inserexs', message)
+
+    def cancel(self):
+        """Call to cancel the running step or FDMNES."""
+        if self.fdmnesTimer.isActive():
+            sm.stop_fdmnes(crystal.process)
+            self.fdmnes_progress()
+            crystal.stopped_early = True  # the ranking uses the finished runs
+            self.statusbar.showMessage('FDMNES stopped, the finished runs are kept.')
+        elif self.worker is not None and self.worker.isRunning():
+            # the step stops at its next progress report, its output is dropped
+            self.worker.cancel()
+            self.progressBar.hide()
+            self.cancelButton.hide()
+            self.statusbar.showMessage('Cancelled.')
+
+    def representation(self, a=None, save=True):
+        """Call to do final plot, exported as a png if "save"."""
         # Check if absolute sensitivity or normalised
         crystal.normalised = self.normalisedCheckbox.isChecked()
 
-        self.graphic = MPLplot()
+        import plot_module as pm  # matplotlib is loaded with the first plot
+        self.graphic = pm.MPLplot(crystal, save=save)
 
         self.graphicLayout.addWidget(self.graphic)
 
+    def interface_state(self):
+        """State of the widgets, saved with the session."""
+        return {'lines': {name: getattr(self, name).text() for name in SESSION_LINES},
+                'checkboxes': {name: getattr(self, name).isChecked()
+                               for name in SESSION_CHECKBOXES},
+                'design': self.designCombo.currentIndex()}
+
+    def save_session(self):
+        """Call to save the session, after every step."""
+        if not hasattr(crystal, 'name'):
+            return
+        ss.save_session(crystal, ss.session_path(self.racine_directory, crystal.name),
+                        self.interface_state())
+
+    def restore_session(self, a=None):
+        """Call to restore a session chosen by the user."""
+        if (self.worker is not None and self.worker.isRunning()) or self.fdmnesTimer.isActive():
+            self.statusbar.showMessage('Wait until the running step is done.')
+            return
+
+        import promptlib  # v3.0.20
+        prompter = promptlib.Files()  # calls for file
+        file_path = prompter.file()
+        if not file_path:  # nothing chosen
+            return
+        if not str(file_path).endswith('_session.npz'):
+            QtWidgets.QMessageBox.warning(self, 'inserexs', 'That is not a session file.')
+            return
+        try:
+            self.show_session(file_path)
+        except Exception as error:  # shown, the current crystal is kept
+            QtWidgets.QMessageBox.warning(self, 'inserexs', f'Session not restored: {error}')
+
+    def show_session(self, file_path):
+        """Call to load a session file, the widgets are filled again."""
+        restored = Crystal()
+        interface = ss.load_session(restored, file_path)
+        global crystal
+        crystal = restored
+
+        for name, text in interface.get('lines', {}).items():
+            getattr(self, name).setText(text)
+        for name, checked in interface.get('checkboxes', {}).items():
+            getattr(self, name).setChecked(checked)
+        self.designCombo.setCurrentIndex(interface.get('design', 0))
+
+        self.show_crystal()
+        # checkboxes in the same order as in refinement_checks
+        for i in getattr(crystal, 'edge_checked_list', []):
+            self.edgeButtons.buttons()[i].setChecked(True)
+        for i in getattr(crystal, 'refinement_checked_list', []):
+            self.groupButton.buttons()[i].setChecked(True)
+
+        if hasattr(crystal, 'reflections_dis'):
+            self.show_reflections(crystal.reflections_dis)
+        if hasattr(crystal, 'results'):
+            self.representation(save=False)  # exported when calculated
+        self.statusbar.showMessage(f'Session of {crystal.name} restored.')
+
+    def restore_last_session(self):
+        """Call at launch to restore the most recent session, if any."""
+        sessions = sorted(Path(self.racine_directory, 'Sessions').glob('*_session.npz'),
+                          key=os.path.getmtime)
+        if len(sessions) == 0:
+            return
+        try:
+            self.show_session(sessions[-1])
+        except Exception as error:  # a broken session must not stop the launch
+            self.statusbar.showMessage(f'Session not restored: {error}')
+
+    def closeEvent(self, event):
+        """Call when the window is closed, the session is saved."""
+        self.save_session()
+        super().closeEvent(event)
+
 
 class Crystal:
     """Class for the creation of a crystal, object."""
@@ -296,97 +561,53 @@ class Crystal:
         if self.sgnumber >= 168:
             return True
 
-class myThread(threading.Thread):
-    """Create a thread object."""
+class Cancelled(Exception):
+    """Raised in a worker's function once the worker is cancelled."""
+
+
+class Worker(QtCore.QThread):
+    """Thread running a heavy stage, its output is sent with a signal.
+
+    The function is called as function(arg, progress), progress(done, total)
+    sends the percentage done and raises Cancelled once cancelled.
+    """
 
-    output = ''
+    done = QtCore.pyqtSignal(object)
+    failed = QtCore.pyqtSignal(str)
+    progress = QtCore.pyqtSignal(int)  # percentage done
 
-    def __init__(self, function, arg):
-        threading.Thread.__init__(self)
+    def __init__(self, function, arg, message='', parent=None):
+        super().__init__(parent)
         self.function = function
         self.arg = arg
-
-        self._stop_event = threading.Event()
+        self.message = message  # shown in the status bar while running
+        self.cancelled = False
+        self.percent = -1  # last percentage sent
 
     def run(self):
         """Run the thread's function."""
-        global threadLock
-        threadLock.acquire()  # get lock to synchro threads
-        self.output = self.function(self.arg)  # the function is executed
-        threadLock.release()  # release
-
-    def stop(self):
-        """Stop the active thread."""
-        self._stop_event.set()
-
-
-class MPLplot(FC):
-    """Class for the representation."""
-
-    def __init__(self, parent=None):
-        self.fig, self.ax = plt.subplots(1, figsize=(5, 5), facecolor='white')
-        plt.rcParams['font.size'] = 15
-        self.ax.xaxis.get_label().set_fontsize(15)
-        self.ax.xaxis.get_label().set_fontsize(15)
+        try:
+            output = self.function(self.arg, self.report)  # the function is executed
+        except Exception as error:  # shown by the GUI, not lost in the thread
+            if not self.cancelled:
+                self.failed.emit(f'{type(error).__name__}: {error}')
+            return
+        if not self.cancelled:
+            self.done.emit(output)
+
+    def report(self, done, total):
+        """Send the progress of the function, stop it if cancelled."""
+        if self.cancelled:
+            raise Cancelled()
+        percent = 100*done//max(total, 1)
+        if percent != self.percent:  # one signal per percent, not per run
+            self.percent = percent
+            self.progress.emit(percent)
+
+    def cancel(self):
+        """Stop the function at its next progress report, drop its output."""
+        self.cancelled = True
 
-        super().__init__(self.fig)
-
-        x = crystal.results['Intensities']
-        if crystal.normalised:
-            y = crystal.results['Sensitivities (I norm)']
-        else:
-            y = crystal.results['Sensitivities']
-
-        # list containing the occupied coordinates. If a new reflection is too
-        occ_coordinates = []
-
-        colorgen = iter(plt.cm.rainbow(np.linspace(0, 1, len(crystal.results['Reflections'])))) # to put each label in a color
-
-        for i in range(len(crystal.results['Reflections'])):
-            x_text = crystal.results['Intensities'][i]
-
-            if crystal.normalised:
-                y_text = crystal.results['Sensitivities (I norm)'][i]
-            else:
-                y_text = crystal.results['Sensitivities'][i]
-
-            x_text = self.coordinate_comeback(x_text)
-            y_text = self.coordinate_comeback(y_text)
-
-            color_j = next(colorgen)
-
-            # close to an existing one, the label is not shown
-            for coord in occ_coordinates:
-                if math.sqrt((x_text - coord[0])**2 + (y_text - coord[1])**2) < 20:
-                    break
-            else:
-                self.ax.text(x_text, y_text, str(crystal.results['Reflections'][i]),
-                             color=color_j, fontsize=15)
-                self.ax.scatter(x[i], y[i], color=color_j)
-
-            occ_coordinates.append((x_text, y_text))
-
-        plt.xlim([-5, 105]), plt.ylim([-5, 105])
-        sns.set_style('ticks')
-
-        self.ax.set_xlabel('Intensity (%)', fontsize=18)
-
-        if crystal.normalised:
-            self.ax.set_ylabel('Sensitivity (norm.) (%)', fontsize=18)
-        else:
-            self.ax.set_ylabel('Sensitivity (%)', fontsize=18)
-
-        plt.subplots_adjust(left=0.2, bottom=0.2)
-        self.fig.text(0,0,'.', color='white') # positioning issue
-
-        plt.savefig(crystal.name + '.png',  dpi = 500, bbox_inches = 'tight')
-
-    def coordinate_comeback(self, coord):
-        """Call to bring reflections into the representation."""
-        if coord + 2 <= 100:
-            return coord + 2
-        else:
-            return coord - 9
 
 def error_strip(a):
     """Check if a parameter has an error in it and strip it."""
@@ -425,6 +646,7 @@ def get_crystal_info(obj, CIF):
     if hasattr(obj, '_space_group_IT_number'):
         obj.sgnumber = int(CIF['_space_group_IT_number'])
     else: # retrieve number from space group symbol
+        import pyxtal  # v0.5.5, slow to import, only needed here
         obj.sgnumber = int((pyxtal.symmetry.Group(obj.spacegroup)).number)
 
     # Check if hexagonal space group - for Miller-Bravais notation
@@ -461,12 +683,13 @@ def get_crystal_info(obj, CIF):
     return
 
 
-def fun_fetch_reflections(obj):
+def fun_fetch_reflections(obj, progress=None):
     """Fecth the reflections."""
     hkl_and_Int = im.intensity_calculation(obj)
 
     global crystal
     crystal.reflections = hkl_and_Int
+    crystal.reachable = None  # set again by the input generation
 
     # We define display reflections, adding "i" if hexagonal:
     if crystal.hex == False:
@@ -477,38 +700,59 @@ def fun_fetch_reflections(obj):
     return crystal.reflections_dis
 
 
-def fun_fetch_sensitivity(obj):
-    """Fetch the sensitivity."""
-    filenumber = sm.input_generator(obj)
+def fun_fetch_sensitivity(obj, progress=None):
+    """Fetch the sensitivity, then launch FDMNES."""
+    filenumber = sm.input_generator(obj, progress)
+    fun_run_fdmnes(obj, progress)
     return filenumber
 
 
-def fun_run_fdmnes(a=0):
+def fun_run_fdmnes(obj, progress=None):
     """Run the FDMNES program."""
-    sm.instructions(crystal.name, crystal.filenumber)
-    sm.run_fdmnes()
+    sm.instructions(obj.workspace, obj.jobs)
+    obj.process = None
+    if len(obj.jobs) > 0:  # results may all be known already
+        sm.extract_inputs(obj)
+        if progress is not None:  # last chance to cancel before launching
+            progress(1, 1)
+        obj.process = sm.run_fdmnes(obj.workspace)
+
+
+def fun_monitor_step(monitor, progress=None):
+    """Read the new results of a running campaign, with its provisional results."""
+    converged = monitor.step(True, progress)
+    results = None
+    if monitor.accumulator.count > 0:
+        results = sm.provisional_results(monitor.crystal, monitor.accumulator)
+    return converged, results
+
+
+def fun_resume_campaign(obj, progress=None):
+    """Relaunch FDMNES for the runs without a valid result."""
+    obj.stopped_early = False
+    obj.process = sm.resume_campaign(obj)
+    return
 
 
-def fun_sen_calcul(crystal):
-    """Call to calculate the sensitivity."""
-    crystal.results = sm.sensitivity_calculation(crystal)
+def fun_rebroaden(obj, progress=None):
+    """Convolve every raw spectrum again, then the sensitivities."""
+    sm.reconvolve(obj, force=True)
+    fun_sen_calcul(obj, progress)
     return
 
 
-def thread_join(thread):
-    """Call this function to join the thread."""
-    global threads
-    threads.append(thread)
-    for thr in threads:
-        thr.join()
+def fun_sen_calcul(crystal, progress=None):
+    """Call to calculate the sensitivity."""
+    crystal.results = sm.sensitivity_calculation(crystal, progress)
+
+    # per parameter indices, only possible with a saltelli design
+    if crystal.sampling == 'saltelli':
+        crystal.sobol = sm.sobol_calculation(crystal)
     return
 
 
 if __name__ == '__main__':  # only executes the below code if  main
 
-    threads = []  # list to save all threads
-    threadLock = threading.Lock()  # for the threads
-
     crystal = Crystal()
     # main app
 
@@ -516,6 +760,7 @@ if __name__ == '__main__':  # only executes the below code if  main
     screen_GUI = Screen()  # we create the object
 
     screen_GUI.show()
+    screen_GUI.restore_last_session()  # results of the last time, if any
 
     try:
         sys.exit(app.exec())  # execution
@@ -51,11 +51,11 @@ import threading  # v4.1.0
 import matplotlib.pyplot as plt  # v3.5.1
 import seaborn as sns #v0.12.1
 from glob import glob # v11.7
-import CifFile #v4.4.5
 
 # Own modules, to be placed in same folder:
 import intensity_module as im
 import sensitivity_module as sm
+import cif_module as cif
 
 
 home_cwd = os.getcwd()  # current cwd
@@ -88,8 +88,8 @@ class backbone():
             sel_filtered = ''.join([c for c in selection if c.isalnum()])
             file_cif = project_files[int(sel_filtered)]
 
-        # load crystal info
-        cf_object = CifFile.ReadCif(file_cif)
+        # load crystal info, PyCifRW only for unusual files
+        cf_object = cif.read_cif(file_cif)
         get_crystal_info(crystal, cf_object)
 
     def fetch_reflections(self):
@@ -176,11 +176,37 @@ class backbone():
 
         # to see if parameters should be coupled:
         crystal.coupled = input('Do you want to couple the parameters? [y/n]').lower().strip() == 'y'
+        if not crystal.coupled:
+            print('Sampling designs: combinations, oat, central, lhs, sobol, halton, saltelli')
+            crystal.design = input('Sampling design (empty for combinations): ').strip().lower() or 'combinations'
+            budget = input('Maximum number of simulations (empty for the default): ')
+            crystal.nsim = int(budget) if budget.strip() else None
+
+        # raw spectra broadened by the program, not by FDMNES:
+        crystal.python_convolution = input('Broaden the spectra after the simulations? [y/n]: ').lower().strip() == 'y'
+
+        # cheap screening of every reflection, then the best at full accuracy:
+        crystal.two_stage = input('Screen at low fidelity first? [y/n]: ').lower().strip() == 'y'
+        if crystal.two_stage:
+            crystal.top = int(input('Number of reflections to refine at full fidelity: '))
+            points = input('Number of parameter sets to refine (empty for all): ')
+            crystal.points = int(points) if points.strip() else None
+            crystal.adaptive = input('Fine energy step only where the screening changes most? [y/n]: ').lower().strip() == 'y'
+
+        # early stop once the reflection ranking does not change anymore:
+        tolerance = input('Stop when the ranking converges, Kendall tau tolerance (empty to run all): ')
+        crystal.tolerance = float(tolerance) if tolerance.strip() else None
+        if crystal.two_stage:
+            fun_two_stage(crystal)
+            return
         self.fetch_sensitivity()  # launches for sensitivity calculation
         self.launch_fdmnes()  # launches FDMNES
 
     def sencalcul(self):
         """Call to calculate the intensity."""
+        if crystal.two_stage:  # results are already merged
+            self.representation()
+            return
         thread_SC = myThread(fun_sen_calcul, crystal)
         thread_SC.start()
         thread_join(thread_SC)  # we join the thread to the rest
@@ -292,6 +318,11 @@ def coordinate_comeback(coord):
         return coord - 9
 
 
+def error_strip(a):
+    """Strip the uncertainty of a value, as 0.1234(5)."""
+    return str(a).split('(')[0]
+
+
 def get_crystal_info(obj, CIF):
     """
     We give crystal object, sym op object and CIF object.
@@ -302,13 +333,13 @@ def get_crystal_info(obj, CIF):
     CIFdata = CIF[CIF.keys()[0]]
 
     # Loads each parameter
-    obj.a = float(CIFdata['_cell_length_a'])
-    obj.b = float(CIFdata['_cell_length_b'])
-    obj.c = float(CIFdata['_cell_length_c'])
+    obj.a = float(error_strip(CIFdata['_cell_length_a']))
+    obj.b = float(error_strip(CIFdata['_cell_length_b']))
+    obj.c = float(error_strip(CIFdata['_cell_length_c']))
 
-    obj.alpha = float(CIFdata['_cell_angle_alpha'])
-    obj.beta = float(CIFdata['_cell_angle_beta'])
-    obj.gamma = float(CIFdata['_cell_angle_gamma'])
+    obj.alpha = float(error_strip(CIFdata['_cell_angle_alpha']))
+    obj.beta = float(error_strip(CIFdata['_cell_angle_beta']))
+    obj.gamma = float(error_strip(CIFdata['_cell_angle_gamma']))
 
     sg_info = CIFdata['_symmetry_space_group_name_H-M'].replace(' ', '')
     if ':' in sg_info:
@@ -328,14 +359,15 @@ def get_crystal_info(obj, CIF):
 
     # Atomic positions:
     atom_list = CIFdata['_atom_site_label']
-    x_list = CIFdata['_atom_site_fract_x']
-    y_list = CIFdata['_atom_site_fract_y']
-    z_list = CIFdata['_atom_site_fract_z']
+    x_list = [error_strip(x) for x in CIFdata['_atom_site_fract_x']]
+    y_list = [error_strip(y) for y in CIFdata['_atom_site_fract_y']]
+    z_list = [error_strip(z) for z in CIFdata['_atom_site_fract_z']]
 
     if '_atom_site_occupancy' not in CIFdata.keys():
         occ_list = np.ones(len(x_list))
     else:
-        occ_list = CIFdata['_atom_site_occupancy']
+        occ_list = [error_strip(occ)
+                    for occ in CIFdata['_atom_site_occupancy']]
 
     for index in range(len(x_list)):
         obj.add((atom_list[index], x_list[index], y_list[index],
@@ -353,6 +385,8 @@ def fun_fetch_reflections(obj):
 
     global crystal
     crystal.reflections = hkl_and_Int
+    crystal.reflections_dis = crystal.reflections  # no hkil notation here
+    crystal.reachable = None  # set again by the input generation
     return hkl_and_Int
 
 
@@ -364,17 +398,91 @@ def fun_fetch_sensitivity(obj):
 
 def fun_run_fdmnes(a=0):
     """Run the FDMNES program."""
-    sm.instructions(crystal.name, crystal.filenumber)
-    sm.run_fdmnes()
+    sm.instructions(crystal.workspace, crystal.jobs)
+    crystal.process = None
+    if len(crystal.jobs) > 0:  # results may all be known already
+        sm.extract_inputs(crystal)
+        crystal.process = sm.run_fdmnes(crystal.workspace)
 
 
 def fun_sen_calcul(crystal):
     """Call to calculate the sensitivity."""
-    input('Press enter when FDMNES is done: ')
+    if crystal.tolerance is None:
+        input('Press enter when FDMNES is done: ')
+    else:
+        report = sm.monitor_campaign(crystal, crystal.process,
+                                     tolerance=crystal.tolerance)
+        print(f"{report['runs done']} of {report['runs planned']} runs done, "
+              f"{report['runs saved']} saved ({100*report['fraction saved']:.0f} %).")
     crystal.results = sm.sensitivity_calculation(crystal)
+
+    # per parameter indices, only possible with a saltelli design
+    if crystal.sampling == 'saltelli':
+        crystal.sobol = sm.sobol_calculation(crystal)
+
+    # other broadenings of the raw spectra, without FDMNES:
+    if crystal.python_convolution:
+        widths = input('Broaden again, core-hole, maximum and Gaussian widths in eV (empty to skip): ')
+        while widths.strip():
+            try:
+                gamma_hole, gamma_max, sigma = (float(width) for width in widths.split())
+            except ValueError:
+                print('Three widths are needed, e.g. "1 15 0".')
+                break
+            sm.reconvolve(crystal, force=True, gamma_hole=gamma_hole,
+                          gamma_max=gamma_max, sigma=sigma)
+            crystal.results = sm.sensitivity_calculation(crystal)
+            if crystal.sampling == 'saltelli':
+                crystal.sobol = sm.sobol_calculation(crystal)
+            print(crystal.results)
+            widths = input('Other widths (empty to finish): ')
+
+    # other % variations explored with a surrogate, without FDMNES:
+    percentage = input('Predict the ranking for another % variation (empty to skip): ')
+    while percentage.strip():
+        try:
+            results = sm.surrogate_ranking(crystal, float(percentage))
+            print(f'Surrogate error (leave-one-out): {100*crystal.surrogate.error:.1f} %')
+            print(results)
+        except ValueError as error:
+            print(error)
+            break
+        percentage = input('Another % variation (empty to finish): ')
     return
 
 
+def run_stage(stage):
+    """Generate, simulate and evaluate one campaign, waiting for FDMNES.
+
+    FDMNES is stopped early once the ranking converges, if a tolerance is set.
+    """
+    stage.filenumber = sm.input_generator(stage)
+    sm.instructions(stage.workspace, stage.jobs)
+    if len(stage.jobs) > 0:
+        sm.extract_inputs(stage)
+        process = sm.run_fdmnes(stage.workspace)
+        if stage.tolerance is None:
+            process.wait()
+        else:
+            report = sm.monitor_campaign(stage, process, tolerance=stage.tolerance)
+            print(f"{report['runs done']} of {report['runs planned']} runs done, "
+                  f"{report['runs saved']} saved ({100*report['fraction saved']:.0f} %).")
+    return sm.sensitivity_calculation(stage)
+
+
+def fun_two_stage(crystal):
+    """Screen every reflection at low fidelity, then refine the best ones."""
+    screening = sm.screening_stage(crystal)
+    screening_results = run_stage(screening)
+
+    refinement = sm.refinement_stage(crystal, screening, top=crystal.top,
+                                     points=crystal.points, adaptive=crystal.adaptive)
+    refinement_results = run_stage(refinement)
+
+    crystal.results = sm.merge_fidelities(crystal, screening_results,
+                                          refinement_results)
+
+
 def thread_join(thread):
     """Call this function to join the thread."""
     global threads
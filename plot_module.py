@@ -0,0 +1,213 @@
+"""
+BSD 3-Clause License.
+
+Copyright (c) 2022 CNRS - Université de Strasbourg.
+All rights reserved.
+
+Author : [Antonio Pena Corredor] [antonio.penacorredor@ipcmss.unistra.fr]
+
+This software is a reflection choice framework for Resonant Elastic X-ray Scattering.
+The program consists of different ".py" modules and a "GUI.ui" graphic interface.
+- main.py: backbone, direct exchange with interface.
+- intensity module.py: module for the calculation of the reflection intensities.
+- sensitivity module.py: module for the calculation of the reflection sensitivities.
+- campaign module.py: module for the bookkeeping of the FDMNES campaigns.
+- convolution module.py: module for the broadening of the FDMNES spectra.
+- surrogate module.py: module for the surrogate model of the FDMNES intensities.
+- cube module.py: module for the storage of the energy resolved results.
+- element module.py: module for the element data (Element_data folder).
+- cif module.py: module for the reading of .cif files.
+- plot module.py: module for the representation of the results.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+* Redistributions of source code must retain the above copyright notice, this
+  list of conditions and the following disclaimer.
+
+* Redistributions in binary form must reproduce the above copyright notice,
+  this list of conditions and the following disclaimer in the documentation
+  and/or other materials provided with the distribution.
+
+* Neither the name of the copyright holder nor the names of its
+  contributors may be used to endorse or promote products derived from
+  this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+The program has been coded and tested on python 3.9
+The version is indicated for those modules not included in the standard Python library
+
+Module for the representation of the results.
+
+It is imported with the first plot, so that matplotlib and seaborn are
+not loaded when the program starts. All the points are drawn with a
+single scatter; the labels are placed with a grid of cells as large as
+the minimum label distance, so each label is only compared with the few
+labels of the neighbouring cells. Zooming with the mouse wheel shows
+the labels hidden at full view.
+"""
+
+import os
+import threading
+import numpy as np  # v1.21.5
+import matplotlib as mpl  # v3.5.1
+from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FC  # v3.5.1
+from matplotlib.figure import Figure  # v3.5.1
+import seaborn as sns # v0.12.1
+
+FULL_VIEW = (-5, 105)  # axes limits, the values are percentages
+LABEL_DISTANCE = 20  # labels closer than this at full view are hidden
+ZOOM = 1.5  # per step of the mouse wheel
+
+sns.set_style('ticks')
+mpl.rcParams['font.size'] = 15
+
+
+def plot_data(crystal):
+    """Intensities, sensitivities, labels and colours of the reflections."""
+    results = crystal.results
+    x = results['Intensities'].to_numpy(dtype=float)
+    if crystal.normalised:
+        y = results['Sensitivities (I norm)'].to_numpy(dtype=float)
+    else:
+        y = results['Sensitivities'].to_numpy(dtype=float)
+    labels = [str(label) for label in results['Reflections']]
+    colors = mpl.cm.rainbow(np.linspace(0, 1, len(labels)))  # to put each label in a color
+    return x, y, labels, colors
+
+
+def label_layout(x, y, radius):
+    """Mask of the points labelled, in their order: a label closer than
+    radius to an already placed one is not shown.
+
+    Placed labels are at least radius apart, so a cell of that size holds
+    a handful of them and the 3 x 3 cells around a point are checked.
+    """
+    shown = np.zeros(len(x), dtype=bool)
+    cells = {}
+    columns = np.floor(np.asarray(x)/radius).astype(int)
+    rows = np.floor(np.asarray(y)/radius).astype(int)
+    for i in range(len(x)):
+        close = any((x[i] - x[j])**2 + (y[i] - y[j])**2 < radius**2
+                    for dx in (-1, 0, 1) for dy in (-1, 0, 1)
+                    for j in cells.get((columns[i] + dx, rows[i] + dy), ()))
+        if not close:
+            shown[i] = True
+            cells.setdefault((columns[i], rows[i]), []).append(i)
+    return shown
+
+
+def coordinate_comeback(coord, upper, scale=1):
+    """Label positions, kept inside the axes (upper limit)."""
+    return np.where(coord + 2*scale <= upper - 5*scale, coord + 2*scale, coord - 9*scale)
+
+
+def place_labels(ax, x, y, labels, colors, xlim=FULL_VIEW, ylim=FULL_VIEW):
+    """Write the labels that fit in a view, returns the text artists."""
+    scale = (xlim[1] - xlim[0])/(FULL_VIEW[1] - FULL_VIEW[0])  # 1 at full view
+    x_text = coordinate_comeback(x, xlim[1], scale)
+    y_text = coordinate_comeback(y, ylim[1], scale)
+
+    visible = np.flatnonzero((x >= xlim[0]) & (x <= xlim[1]) & (y >= ylim[0]) & (y <= ylim[1]))
+    shown = visible[label_layout(x_text[visible], y_text[visible], LABEL_DISTANCE*scale)]
+    return [ax.text(x_text[i], y_text[i], labels[i], color=colors[i], fontsize=15)
+            for i in shown]
+
+
+def draw(fig, ax, x, y, colors, normalised):
+    """Draw the points and the axes."""
+    ax.scatter(x, y, color=colors)
+    ax.set_xlim(FULL_VIEW), ax.set_ylim(FULL_VIEW)
+    ax.set_xlabel('Intensity (%)', fontsize=18)
+
+    if normalised:
+        ax.set_ylabel('Sensitivity (norm.) (%)', fontsize=18)
+    else:
+        ax.set_ylabel('Sensitivity (%)', fontsize=18)
+
+    fig.subplots_adjust(left=0.2, bottom=0.2)
+    fig.text(0, 0, '.', color='white') # positioning issue
+
+
+def new_figure():
+    """Figure with the style of the program, outside pyplot."""
+    fig = Figure(figsize=(5, 5), facecolor='white')
+    return fig, fig.add_subplot()
+
+
+# one lock per exported file, two plots never write it at the same time
+export_locks = {}
+
+
+def export(file_path, x, y, labels, colors, normalised, dpi=500):
+    """Save the full view in its own figure, in a background thread.
+
+    The figure is not the one on screen, so the thread never touches an
+    artist of the GUI. It is written to a temporary file then renamed, so
+    the png is never half written. Returns the thread.
+    """
+    lock = export_locks.setdefault(os.path.abspath(file_path), threading.Lock())
+
+    def save():
+        fig, ax = new_figure()
+        draw(fig, ax, x, y, colors, normalised)
+        place_labels(ax, x, y, labels, colors)
+        with lock:
+            temporary = f'{file_path}.tmp'
+            fig.savefig(temporary, dpi=dpi, bbox_inches='tight', format='png')
+            os.replace(temporary, file_path)
+
+    thread = threading.Thread(target=save, daemon=False)
+    thread.start()
+    return thread
+
+
+class MPLplot(FC):
+    """Class for the representation, exported to {name}.png if "save"."""
+
+    def __init__(self, crystal, parent=None, save=True):
+        self.fig, self.ax = new_figure()
+        super().__init__(self.fig)
+        self.setParent(parent)
+
+        self.x, self.y, self.labels, self.colors = plot_data(crystal)
+        draw(self.fig, self.ax, self.x, self.y, self.colors, crystal.normalised)
+        self.texts = place_labels(self.ax, self.x, self.y, self.labels, self.colors)
+
+        self.mpl_connect('scroll_event', self.zoom)
+
+        self.export = None
+        if save:
+            self.export = export(crystal.name + '.png', self.x, self.y, self.labels,
+                                 self.colors, crystal.normalised)
+
+    def zoom(self, event):
+        """Call on the mouse wheel: zoom around the pointer, more labels appear."""
+        if event.xdata is None:
+            return
+        factor = 1/ZOOM if event.button == 'up' else ZOOM
+        xlim = self.limits(self.ax.get_xlim(), event.xdata, factor)
+        ylim = self.limits(self.ax.get_ylim(), event.ydata, factor)
+        self.ax.set_xlim(xlim), self.ax.set_ylim(ylim)
+
+        for text in self.texts:
+            text.remove()
+        self.texts = place_labels(self.ax, self.x, self.y, self.labels, self.colors, xlim, ylim)
+        self.draw_idle()
+
+    def limits(self, limits, center, factor):
+        """Axis limits zoomed around a point, never beyond the full view."""
+        span = min((limits[1] - limits[0])*factor, FULL_VIEW[1] - FULL_VIEW[0])
+        lower = min(max(center - (center - limits[0])*factor, FULL_VIEW[0]),
+                    FULL_VIEW[1] - span)
+        return float(lower), float(lower + span)
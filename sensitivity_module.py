@@ -43,23 +43,45 @@ The version is indicated for those modules not included in the standard Python l
 Module for the sensitivity calculation.
 """
 import os
+import copy
 from pathlib import Path
 import sys
 import subprocess
+import time
+import tempfile
 import numpy as np  # v1.21.5
-import pandas as pd  # v1.4.2
 from itertools import combinations_with_replacement
-import intensity_module as im
-import promptlib  # v3.0.20
+import campaign_module as cm
+import convolution_module as cv
+import surrogate_module as sg
+import cube_module as cb
+import element_module as el
 
 
-def input_generator(crystal):
-    """Generate input for FDMNES."""
+# FDMNES settings: cluster radius (A), energy step factor, quadrupole terms
+FIDELITIES = {'full': {'radius': 5, 'step': 1, 'quadrupole': True},
+              'low': {'radius': 3, 'step': 4, 'quadrupole': False}}
+
+# energies per block when the intensity cube is processed piecewise
+ENERGY_BLOCK = 256
+
+# designs whose estimator needs every run, never stopped early
+COMPLETE_DESIGNS = ('oat', 'central', 'saltelli')
+
+# broadening of the raw spectra (eV) when convolved by the program
+BROADENING = {'gamma_hole': 1.0, 'gamma_max': 15.0, 'sigma': 0.0}
+
+
+def input_generator(crystal, progress=None):
+    """Generate input for FDMNES.
+
+    progress(done, total) is called for each run, it can raise to cancel.
+    """
     chosen_atoms = [crystal.atom_list[i][0][:2]
                     for i in crystal.edge_checked_list]
 
     # List including the atomic information of the present atoms
-    chosen_atomic_info = list(set([(Atomic_number(atom))
+    chosen_atomic_info = list(set([el.properties(atom)
                                   for atom in chosen_atoms]))
 
     # chosen Z:
@@ -71,354 +93,1168 @@ def input_generator(crystal):
     reflection_lines_str = '\n'.join([''.join(str(reflection[0])) + '  1  1       0.'
                                       for reflection in allowed_reflections]).replace('(', '').replace(')', '').replace(',', '')
 
-    E_start, E_end, step = crystal.E_start, crystal.E_stop, crystal.E_step
     percentage = crystal.percent
 
     # To see which parameters should be refined:
 
-    """
-    The program has been designed to fetch the program in an FDMNES
-    folder located in the same home directory. This can be changed according
-    to the user's preferences. However, the different working files and
-    the results will be saved in this directory, so its creation is highly
-    recommended before running inserexs.
-
-    In case it does not exist, the program will ask to select where it is
-    """
-
-    global dirfdmnes  # changes variable into global type
-    try:
-        os.chdir(Path(home, 'FDMNES'))
-        dirfdmnes = os.getcwd()
-    except:
-        prompter = promptlib.Files()  # calls for directory
-        dirfdmnes = prompter.dir()  # changes directory
-        os.chdir(Path(dirfdmnes))
-
-    try:
-        os.mkdir(f"{crystal.name}_input")
-    except FileExistsError:
-        pass
+    workspace = get_workspace(crystal)
+    workspace.create()
 
     # number of repetitions, for a practical reason always odd
     Repetitions = crystal.nsym + (crystal.nsym % 2 + 1)
 
-    os.chdir(Path(dirfdmnes, f"{crystal.name}_input"))
-
-    if crystal.coupled:  # If we do not couple parameters
+    n_params = len(crystal.refinement_checked_list)
+    if getattr(crystal, 'samples', None) is not None:  # chosen beforehand
+        crystal.sampling = 'samples'
+        coupling_matrix = [list(item_set) for item_set in crystal.samples]
+    elif crystal.coupled:  # If we do not couple parameters
+        crystal.sampling = 'coupled'
         coupling_matrix = [[1 + (rep - Repetitions//2)*percentage/100
-                            for i in range(len(crystal.refinement_checked_list))]
+                            for i in range(n_params)]
                            for rep in range(Repetitions)]
     else:
-        values = [1 + (rep - Repetitions//2)*percentage/100
-                  for rep in range(Repetitions)]  # creates values
-        coupling_matrix = list(combinations_with_replacement(values, len(crystal.refinement_checked_list)))
+        crystal.sampling = getattr(crystal, 'design', 'combinations')
+        budget = int(crystal.nsim) if getattr(crystal, 'nsim', None) else None
+        coupling_matrix = sampling_design(crystal.sampling, n_params,
+                                          Repetitions, percentage, budget)
+
+    # the sampled factors are kept for the estimators
+    crystal.parameters = np.array(coupling_matrix, dtype=float)
+    crystal.parameter_labels = [crystal.atom_list[item//4][0] + '_' + ('x', 'y', 'z', 'occ')[item % 4]
+                                for item in sorted(crystal.refinement_checked_list)]
+    np.savetxt(Path(workspace.inputs, 'parameters.txt'), crystal.parameters, fmt='%.6f',
+               header=crystal.sampling + '\n' + ' '.join(crystal.parameter_labels))
+
+    # identical inputs are simulated once, known ones not at all:
+    store_dir = workspace.store
+    crystal.run_keys = []  # key of the input of every run
+    crystal.jobs = []  # runs to be simulated by FDMNES
+    seen_keys = set()  # same keys as run_keys, for fast lookups
+
+    # an interrupted campaign keeps the valid results of the same inputs
+    manifest = cm.read_manifest(workspace.inputs)
+    previous_keys = [] if manifest is None else [run['key'] for run in manifest['runs']]
+    shape = result_shape(crystal)
+    status = []
+
+    # the invariant sections are rendered once, only atoms change
+    header, footer = input_template(crystal, chosen_atomic_numbers,
+                                    reflection_lines_str,
+                                    FIDELITIES[getattr(crystal, 'fidelity', 'full')])
+    atomic_numbers = el.atomic_number([atom[0] for atom in crystal.atom_list[:crystal.n]])
+    atom_template = [[' ' + str(atomic_numbers[atom]),
+                      str(float(crystal.atom_list[atom][1])),
+                      str(float(crystal.atom_list[atom][2])),
+                      str(float(crystal.atom_list[atom][3])),
+                      str(1.0)]  # occupation written as 1.0
+                     for atom in range(crystal.n)]
+    base_values = [1.0 if item % 4 == 3 else float(crystal.atom_list[item//4][item % 4 + 1])
+                   for item in range(4*crystal.n)]
+    refined_items = sorted(crystal.refinement_checked_list)  # order of item_set
+
+    slash = '\\' if 'win' in sys.platform else '/'
+
+    # inputs and results in one file each, or as separated files; FDMNES
+    # reads its inputs by path, the archive extracts them before the launch
+    if getattr(crystal, 'archive', False):
+        crystal.input_archive = cm.Archive(Path(workspace.run_dir, f"{workspace.inputs.name}.tar"))
+        crystal.results_archive = cm.Archive(Path(workspace.results, f"{crystal.name}_results.tar"))
+    else:
+        crystal.input_archive = crystal.results_archive = None
 
     locator = 0  # for the locator
     for item_set in coupling_matrix:
+        if progress is not None:
+            progress(locator, len(coupling_matrix))
+
+        atom_lines = [line.copy() for line in atom_template]
+        for i, item in enumerate(refined_items):
+            atom_lines[item//4][item % 4 + 1] = str(round(base_values[item] * item_set[i], 3))
+
+        text = ''.join([f'Filout \n{workspace.results_name}{slash}result_{locator}\n',
+                        header,
+                        '\n'.join(f"{line[0]}      {line[1]}   {line[2]}   {line[3]}   {line[4]}"
+                                  for line in atom_lines),
+                        footer])
+
+        key = cm.input_key(text)
+        crystal.run_keys.append(key)
+        old_result = workspace.result_path(locator)
+        old_raw = Path(workspace.results, f'result_{locator}.txt')
+        same_input = locator < len(previous_keys) and previous_keys[locator] == key
+        if same_input and cm.valid_result(result_source(crystal, locator), shape):
+            status.append('done')  # already simulated in this campaign
+        else:
+            if old_result.exists():  # results of another campaign
+                os.remove(old_result)
+            if not same_input and old_raw.exists():
+                os.remove(old_raw)
+            if key not in seen_keys and cm.stored_result(store_dir, key, raw_suffix(crystal)) is None:
+                if crystal.input_archive is not None:
+                    crystal.input_archive.add(f'input_{locator}.txt', text)
+                else:
+                    with open(Path(workspace.inputs, f'input_{locator}.txt'), 'w') as f:
+                        f.write(text)
+                crystal.jobs.append(locator)
+            status.append('pending')
+        seen_keys.add(key)
 
-        list_atom_lines = []
+        locator += 1
 
-        i = 0  # item to be modified
-        for atom in range(crystal.n):
+    if crystal.input_archive is not None:
+        crystal.input_archive.close()
+    cm.write_manifest(workspace.inputs, crystal.parameters, crystal.run_keys, status)
 
-            atom_x = float(crystal.atom_list[atom][1])
-            atom_y = float(crystal.atom_list[atom][2])
-            atom_z = float(crystal.atom_list[atom][3])
-            #atom_o = float(crystal.atom_list[atom][4])
-            atom_o = 1.0
+    # FDMNES runs the jobs in a random order, the first results are then a
+    # fair sample of the design for an early stop
+    crystal.jobs = [int(job) for job in np.random.default_rng(0).permutation(crystal.jobs)]
+    print(f'{len(crystal.jobs)} of {locator} runs to be simulated.')
+    return locator  # for the filenumber
 
-            atomic_number = Atomic_number(crystal.atom_list[atom][0])[0]
 
-            if atom*4 in crystal.refinement_checked_list:  # x position
-                atom_x = str(round(atom_x * item_set[i], 3))
-                i += 1
-            if atom*4 + 1 in crystal.refinement_checked_list:  # y position
-                atom_y = str(round(atom_y * item_set[i], 3))
-                i += 1
-            if atom*4 + 2 in crystal.refinement_checked_list:  # z position
-                atom_z = str(round(atom_z * item_set[i], 3))
-                i += 1
-            if atom*4 + 3 in crystal.refinement_checked_list:  # occupation
-                atom_o = str(round(atom_o * item_set[i], 3))
-                i += 1
+def get_workspace(crystal):
+    """Return the workspace of the crystal, created on first use.
 
-            list_atom_lines.append(f" {atomic_number}      {atom_x}   {atom_y}   {atom_z}   {atom_o}")
+    The program has been designed to fetch the program in an FDMNES
+    folder located in the same home directory. This can be changed according
+    to the user's preferences. However, the different working files and
+    the results will be saved in this directory, so its creation is highly
+    recommended before running inserexs.
 
-        # text for atom_lines
-        atom_lines = '\n'.join(list_atom_lines)
+    In case it does not exist, the program will ask to select where it is
+    """
+    workspace = getattr(crystal, 'workspace', None)
+    if workspace is None or workspace.name != crystal.name:
+        fdmnes_dir = Path(home, 'FDMNES')
+        if not fdmnes_dir.is_dir():
+            import promptlib  # v3.0.20
+            prompter = promptlib.Files()  # calls for directory
+            fdmnes_dir = prompter.dir()
+        crystal.workspace = cm.Workspace(home, fdmnes_dir, crystal.name)
+    return crystal.workspace
+
+
+def input_template(crystal, chosen_atomic_numbers, reflection_lines_str,
+                   fidelity=None):
+    """Render the sections of the input that do not change between runs.
+
+    Returns the text between the Filout block and the atom lines, and the
+    text after the atom lines. The fidelity sets the cluster radius, the
+    energy step and the multipoles (see FIDELITIES).
+    """
+    fidelity = fidelity or FIDELITIES['full']
+    E_start = crystal.E_start
 
-        # if the SG has a seeting, it should be considered:
-        if hasattr(crystal, 'setting'):
-            spacegroup = str(crystal.spacegroup) + ':' + str(crystal.setting)
-        else:
-            spacegroup = str(crystal.spacegroup)
-
-        slash = '\\' if 'win' in sys.platform else '/'
-
-        # header:
-        text = ['Filout \n',
-                f'FileResults{slash}result_{locator}',
-                '\n',
-                '    Range \n',
-                f' {E_start}  {step}  {E_end} \n',
-                '\n',
-                ' Eimag',
-                '  0.1 \n',
-                '\n',
-                'Radius \n',
-                ' 5\n',
-                ' \n',
-                ' Green \n',
-                ' Quadrupole \n',
-                ' Density \n',
-                ' Spherical \n',
-                '\n',
-                ' Z_absorber \n',
-                ' '.join(chosen_atomic_numbers) + ' \n',
-                '\n',
-                'RXS \n',
-                str(reflection_lines_str).replace('[', '').replace(']', '').replace(',', ''),
-                '\n',
-                'Spgroup \n',
-                spacegroup,
-                '\n',
-                'Crystal_t \n',
-                '         ' + "{:.5f}".format(crystal.a) + ' ' + "{:.5f}".format(crystal.b) + ' ' + "{:.5f}".format(crystal.c) + '  ' + str(crystal.alpha) + ' ' + str(crystal.beta) + ' ' + str(crystal.gamma) + '\n',
-                str(atom_lines).replace('[', '').replace(']', '').replace(',', ''),
-                '\n'
-                'Convolution \n'
-                '\n',
-                'Estart \n',
-                f'{E_start} \n',
-                ' \n',
-                'End \n']
-
-        f = open(f'input_{locator}.txt', 'w')
-        f.write(''.join(text))
-        f.close()
+    # if the SG has a seeting, it should be considered:
+    if hasattr(crystal, 'setting'):
+        spacegroup = str(crystal.spacegroup) + ':' + str(crystal.setting)
+    else:
+        spacegroup = str(crystal.spacegroup)
+
+    header = ['    Range \n',
+              ' ' + '  '.join(str(value) for value in energy_range(crystal)) + ' \n',
+              '\n',
+              ' Eimag',
+              '  0.1 \n',
+              '\n',
+              'Radius \n',
+              f' {fidelity["radius"]}\n',
+              ' \n',
+              ' Green \n',
+              ' Quadrupole \n' if fidelity['quadrupole'] else '',
+              ' Density \n',
+              ' Spherical \n',
+              '\n',
+              ' Z_absorber \n',
+              ' '.join(chosen_atomic_numbers) + ' \n',
+              '\n',
+              'RXS \n',
+              str(reflection_lines_str).replace('[', '').replace(']', '').replace(',', ''),
+              '\n',
+              'Spgroup \n',
+              spacegroup,
+              '\n',
+              'Crystal_t \n',
+              '         ' + "{:.5f}".format(crystal.a) + ' ' + "{:.5f}".format(crystal.b) + ' ' + "{:.5f}".format(crystal.c) + '  ' + str(crystal.alpha) + ' ' + str(crystal.beta) + ' ' + str(crystal.gamma) + '\n']
+
+    if getattr(crystal, 'python_convolution', False):  # broadened by reconvolve
+        footer = ['\n',
+                  ' \n',
+                  'End \n']
+    else:
+        footer = ['\n'
+                  'Convolution \n'
+                  '\n',
+                  'Estart \n',
+                  f'{E_start} \n',
+                  ' \n',
+                  'End \n']
+    return ''.join(header), ''.join(footer)
+
+
+def sampling_design(design, n_params, Repetitions, percentage, budget=None):
+    """Create the factors applied to the refined parameters for each run.
+
+    - combinations: all the combinations of the values (default).
+    - oat: one parameter at a time over the values, the others unchanged.
+    - central: central difference, one parameter at a time at +/- percentage.
+    - lhs, sobol, halton: space-filling samples over the range of the values.
+    - saltelli: two Sobol sample blocks A, B and one block per parameter
+      taking that column from B and the rest from A, for Sobol indices.
+
+    The budget is the maximum number of runs; the size of combinations and
+    central is fixed by the number of parameters. Sobol uses the largest
+    power of two within the budget, which keeps its balance properties.
+    """
+    values = [1 + (rep - Repetitions//2)*percentage/100
+              for rep in range(Repetitions)]  # creates values
+
+    if design == 'combinations':
+        return [list(item_set) for item_set
+                in combinations_with_replacement(values, n_params)]
+
+    if design in ('oat', 'central'):
+        levels = 1 if design == 'central' else Repetitions//2
+        if budget is not None:  # levels at each side of the unchanged value
+            if budget < 2*n_params + 1:
+                raise ValueError(f"The {design} design needs at least {2*n_params + 1} runs "
+                                 f"for {n_params} parameters, the budget is {budget}.")
+            levels = min(levels, (budget - 1)//(2*n_params))
+        steps = [1 + side*level*percentage/100
+                 for level in range(1, levels + 1) for side in (-1, 1)]
+
+        coupling_matrix = [[1.0]*n_params]  # first run, unchanged structure
+        for param in range(n_params):
+            for step in steps:
+                item_set = [1.0]*n_params
+                item_set[param] = step
+                coupling_matrix.append(item_set)
+        return coupling_matrix
+
+    from scipy.stats import qmc  # v1.7.3, loaded for these designs only
+    span = (Repetitions//2)*percentage/100  # same range as the values
+    n_runs = budget if budget is not None else 10*n_params
+    if design == 'saltelli':  # base samples as a power of two
+        if budget is not None and budget < 2*(n_params + 2):
+            raise ValueError(f"The {design} design needs at least {2*(n_params + 2)} runs "
+                             f"for {n_params} parameters, the budget is {budget}.")
+        n_base = 2**int(np.log2(max(2, n_runs//(n_params + 2))))
+        unit_samples = qmc.Sobol(d=2*n_params, seed=0).random(n_base)
+        A, B = unit_samples[:, :n_params], unit_samples[:, n_params:]
+        blocks = [A, B]
+        for param in range(n_params):
+            AB = A.copy()
+            AB[:, param] = B[:, param]
+            blocks.append(AB)
+        return (1 - span + 2*span*np.vstack(blocks)).tolist()
+
+    if design == 'lhs':
+        unit_samples = qmc.LatinHypercube(d=n_params, seed=0).random(n_runs)
+    elif design == 'sobol':
+        unit_samples = qmc.Sobol(d=n_params, seed=0).random_base2(int(np.log2(n_runs)))
+    elif design == 'halton':
+        unit_samples = qmc.Halton(d=n_params, seed=0).random(n_runs)
+    else:
+        raise ValueError(f'Unknown sampling design "{design}".')
 
-        locator += 1
-        print(locator)
-    return locator  # for the filenumber
+    return (1 - span + 2*span*unit_samples).tolist()
 
 
-def instructions(name, n):
-    """Create instruction file for FDMNES."""
+def instructions(workspace, jobs):
+    """Create instruction file for FDMNES, only for the runs to simulate."""
     slash = '\\' if 'win' in sys.platform else '/'
-    text = [f'{str(n)} \n']
-    for simulation in range(n):
-        text += f'{name}_input{slash}input_{simulation}.txt \n'
+    text = [f'{str(len(jobs))} \n']
+    for simulation in jobs:
+        text += f'{workspace.inputs.name}{slash}input_{simulation}.txt \n'
 
-    os.chdir(dirfdmnes)
-    f = open('fdmfile.txt', 'w')
-    f.write(''.join(text))
+    with open(Path(workspace.run_dir, 'fdmfile.txt'), 'w') as f:
+        f.write(''.join(text))
 
     # for results:
-    try:
-        os.mkdir('FileResults')
-    except OSError:
-        pass
-    f.close()
-
-
-def run_fdmnes():
-    """Run FDMNES."""
-    global dirfdmnes
-    os.chdir(dirfdmnes)
-    if 'win' in sys.platform:
-        os.startfile('fdmnes_win64.exe')
+    os.makedirs(workspace.results, exist_ok=True)
+
+
+def run_fdmnes(workspace):
+    """Run FDMNES, from the run folder of the workspace."""
+    process = None
+    if sys.platform == 'win32':  # own console, as when launched by hand
+        process = subprocess.Popen(str(Path(workspace.fdmnes, 'fdmnes_win64.exe')),
+                                   cwd=workspace.run_dir,
+                                   creationflags=subprocess.CREATE_NEW_CONSOLE)
     elif 'lin' in sys.platform:
-    	subprocess.Popen(str(dirfdmnes + '/fdmnes_linux64'))
-    return
-
-# dic for atomic numbers, Atomic weight, K edge, L1, L2, L3, M1 and M5:
-dic_atomic_numbers ={"H": (1, 1.008, 13.6, 0, 0, 0),
-                     "He": (2, 4.003, 24.6, 0, 0, 0),
-                     "Li": (3, 6.941, 54.8, 0, 0, 0),
-                     "Be": (4, 9.012, 111, 0, 0, 0),
-                     "B": (5, 10.811, 188, 0, 4.7, 4.7),
-                     "C": (6, 12.011, 283.8, 0, 6.4, 6.4),
-                     "N": (7, 14.007, 401.6, 0, 9.2, 9.2),
-                     "O": (8, 15.999, 532, 23.7, 7.1, 7.1),
-                     "F": (9, 18.998, 685.4, 31, 8.6, 8.6),
-                     "Ne": (10, 20.18, 866.9, 45, 18.3, 18.3),
-                     "Na": (11, 22.99, 1072.1, 63.3, 31.1, 31.1),
-                     "Mg": (12, 24.305, 1305, 89.4, 51.4, 51.4),
-                     "Al": (13, 26.982, 1559.6, 117.7, 73.1, 73.1),
-                     "Si": (14, 28.086, 1838.9, 148.7, 99.2, 99.2),
-                     "P": (15, 30.974, 2145.5, 189.3, 132.2, 132.2),
-                     "S": (16, 32.066, 2472, 229.2, 164.8, 164.8),
-                     "Cl": (17, 35.453, 2822.4, 270.2, 201.6, 200),
-                     "Ar": (18, 39.948, 3202.9, 320, 247.3, 245.2),
-                     "K": (19, 39.098, 3607.4, 377.1, 296.3, 293.6),
-                     "Ca": (20, 40.078, 4038.1, 437.8, 350, 346.4),
-                     "Sc": (21, 44.956, 4492.8, 500.4, 406.7, 402.2),
-                     "Ti": (22, 47.88, 4966.4, 563.7, 461.5, 455.5),
-                     "V": (23, 50.942, 5465.1, 628.2, 520.5, 512.9),
-                     "Cr": (24, 51.996, 5989.2, 694.6, 583.7, 574.5),
-                     "Mn": (25, 54.938, 6539, 769, 651.4, 640.3),
-                     "Fe": (26, 55.847, 7112, 846.1, 721.1, 708.1),
-                     "Co": (27, 58.933, 7708.9, 925.6, 793.8, 778.6),
-                     "Ni": (28, 58.69, 8332.8, 1008.1, 871.9, 854.7),
-                     "Cu": (29, 63.546, 8978.9, 1096.1, 951, 931.1),
-                     "Zn": (30, 65.39, 9658.6, 1193.6, 1042.8, 1019.7),
-                     "Ga": (31, 69.723, 10367.1, 1297.7, 1142.3, 1115.4),
-                     "Ge": (32, 72.61, 11103.1, 1414.3, 1247.8, 1216.7),
-                     "As": (33, 74.922, 11866.7, 1526.5, 1358.6, 1323.1),
-                     "Se": (34, 78.96, 12657.8, 1653.9, 1476.2, 1435.8),
-                     "Br": (35, 79.904, 13473.7, 1782, 1596, 1549.9),
-                     "Kr": (36, 83.8, 14325.6, 1921, 1727.2, 1674.9),
-                     "Rb": (37, 85.468, 15199.7, 2065.1, 1863.9, 1804.4),
-                     "Sr": (38, 87.62, 16104.6, 2216.3, 2006.8, 1939.6),
-                     "Y": (39, 88.906, 17038.4, 2372.5, 2155.5, 2080),
-                     "Zr": (40, 91.224, 17997.6, 2531.6, 2306.7, 2222.3),
-                     "Nb": (41, 92.906, 18985.6, 2697.7, 2464.7, 2370.5),
-                     "Mo": (42, 95.94, 19999.5, 2865.6, 2625.1, 2520.2),
-                     "Tc": (43, 98.906, 21044, 3042.5, 2793.2, 2676.9),
-                     "Ru": (44, 101.07, 22117.2, 3224, 2966.9, 2837.9),
-                     "Rh": (45, 102.906, 23219.9, 3411.9, 3146.1, 3003.8),
-                     "Pd": (46, 106.42, 24350.3, 3604.3, 3330.3, 3173.3),
-                     "Ag": (47, 107.868, 25514, 3805.8, 3523.7, 3351.1),
-                     "Cd": (48, 112.411, 26711.2, 4018, 3727, 3537.5),
-                     "In": (49, 114.82, 27939.9, 4237.5, 3938, 3730.1),
-                     "Sn": (50, 118.71, 29200.1, 4464.7, 4156.1, 3928.8),
-                     "Sb": (51, 121.75, 30491.2, 4698.3, 4380.4, 4132.2),
-                     "Te": (52, 127.6, 31813.8, 4939.2, 4612, 4341.4),
-                     "I": (53, 126.904, 33169.4, 5188.1, 4852.1, 4557.1),
-                     "Xe": (54, 131.29, 34561.4, 5452.8, 5103.7, 4782.2),
-                     "Cs": (55, 132.905, 35984.6, 5714.3, 5359.4, 5011.9),
-                     "Ba": (56, 137.327, 37440.6, 5988.8, 5623.6, 5247),
-                     "La": (57, 138.906, 38924.6, 6266.3, 5890.6, 5482.7),
-                     "Ce": (58, 140.115, 40443, 6548.8, 6164.2, 5723.4),
-                     "Pr": (59, 140.908, 41990.6, 6834.8, 6440.4, 5964.3),
-                     "Nd": (60, 144.24, 43568.9, 7126, 6721.5, 6207.9),
-                     "Pm": (61, 146.915, 45184, 7427.9, 7012.8, 6459.3),
-                     "Sm": (62, 150.36, 46834.2, 7736.8, 7311.8, 6716.2),
-                     "Eu": (63, 151.965, 48519, 8052, 7617.1, 6976.9),
-                     "Gd": (64, 157.25, 50239.1, 8375.6, 7930.3, 7242.8),
-                     "Tb": (65, 158.925, 51995.7, 8708, 8251.6, 7514),
-                     "Dy": (66, 162.5, 53788.5, 9045.8, 8580.6, 7790.1),
-                     "Ho": (67, 164.93, 55617.7, 9394.2, 8917.8, 8071.1),
-                     "Er": (68, 167.26, 57485.5, 9751.3, 9264.3, 8357.9),
-                     "Tm": (69, 168.934, 59389.6, 10115.7, 9616.9, 8648),
-                     "Yb": (70, 173.04, 61332.3, 10486.4, 9978.2, 8943.6),
-                     "Lu": (71, 174.967, 63313.8, 10870.4, 10348.6, 9244.1),
-                     "Hf": (72, 178.49, 65350.8, 11270.7, 10739.4, 9560.7),
-                     "Ta": (73, 180.948, 67416.4, 11681.5, 11136.1, 9881.1),
-                     "W": (74, 183.85, 69525, 12099.8, 11544, 10206.8),
-                     "Re": (75, 186.207, 71676.4, 12526.7, 11958.7, 10535.3),
-                     "Os": (76, 190.2, 73870.8, 12968, 12385, 10870.9),
-                     "Ir": (77, 192.22, 76111, 13418.5, 12824.1, 11215.2),
-                     "Pt": (78, 195.08, 78394.8, 13879.9, 13272.6, 11563.7),
-                     "Au": (79, 196.967, 80724.9, 14352.8, 13733.6, 11918.7),
-                     "Hg": (80, 200.59, 83102.3, 14839.3, 14208.7, 12283.9),
-                     "Tl": (81, 204.383, 85530.4, 15346.7, 14697.9, 12657.5),
-                     "Pb": (82, 207.2, 88004.5, 15860.8, 15200, 13035.2),
-                     "Bi": (83, 208.98, 90525.9, 16387.6, 15711.1, 13418.6),
-                     "Po": (84, 208.982, 93105, 16939.3, 16244.3, 13813.8),
-                     "At": (85, 209.987, 95729.9, 17493, 16784.7, 14213.5),
-                     "Rn": (86, 222.018, 98404, 18049, 17337.1, 14619.4),
-                     "Fr": (87, 223.02, 101137, 18639, 17906.5, 15031.2),
-                     "Ra": (88, 226.025, 103921.9, 19236.7, 18484.3, 15444.4),
-                     "Ac": (89, 227.028, 106755.3, 19840, 19083.2, 15871),
-                     "Th": (90, 232.038, 109650.9, 20472.1, 19693.2, 16300.3),
-                     "Pa": (91, 231.036, 112601.4, 21104.6, 20313.7, 16733.1),
-                     "U": (92, 238.029, 115606.1, 21757.4, 20947.6, 17166.3),
-                     "Np": (93, 237.048, 118678, 22426.8, 21600.5, 17610),
-                     "Pu": (94, 244.064, 121818, 23097.2, 22266.2, 18056.8),
-                     "Am": (95, 243.061, 125027, 23772.9, 22944, 18504.1),
-                     "Cm": (96, 247.07, 128200, 24460, 23779, 18930),
-                     "Bk": (97, 247.07, 131590, 25275, 24385, 19452),
-                     "Cf": (98, 251.08, 135960, 26110, 25250, 19930),
-                     "Es": (99, 252.083, 139490, 26900, 26020, 20410),
-                     "Fm": (100, 257.095, 143090, 27700, 26810, 20900),
-                     "Md": (101, 258.099, 146780, 28530, 27610, 21390),
-                     "No": (102, 259.101, 150540, 29380, 28440, 21880),
-                     "Lr": (103, 260.105, 154380, 30240, 29280, 22360)}
-
-
-def Atomic_number(element):
-    """Brings number from element symbol."""
-    letters = [x for x in element]
-
-    chain_no_numbers = ''.join([s for s in letters
-                                if s.isdigit() == False and s.isalnum()])
-
-    return dic_atomic_numbers[chain_no_numbers[:2]]
+        process = subprocess.Popen(str(Path(workspace.fdmnes, 'fdmnes_linux64')),
+                                   cwd=workspace.run_dir)
+    return process  # to follow or stop the campaign
 
 
-def evaluate_ref(crystal, atomic_info_list):
-    """Call to evaluate if reflections are geometrically feasible."""
-    allowed_reflection_list = crystal.reflections
-    for info in atomic_info_list:
+def stop_fdmnes(process):
+    """Stop FDMNES, the pending simulations are not run."""
+    if process is not None and process.poll() is None:
+        process.terminate()
+        process.wait()
+
 
-        # retrieve K edge from previous info:
-        wlength = 1.23984198e4/float(info[2])  # lambda in angstroms
+def reachability_mask(crystal, wavelengths):
+    """Mask (edge x reflection) of the reflections reachable at each edge.
 
-        for reflection in crystal.reflections:
-            try:
-                im.angle_get(reflection[0], crystal.lattice_dimensions,
-                             wlength)
-            except Exception:  # if it is not allowed, removal
-                allowed_reflection_list.remove(reflection)
+    A reflection is reachable if lambda/(2d) <= 1, so its Bragg angle
+    exists. The mask is cached on the crystal for the same reflections,
+    lattice and wavelengths.
+    """
+    hkl = np.array([reflection[0] for reflection in crystal.reflections],
+                   dtype=float).reshape(-1, 3)
+    key = (tuple(wavelengths), tuple(crystal.lattice_dimensions), hkl.tobytes())
+    cache = getattr(crystal, 'reachability', None)
+    if cache is not None and cache[0] == key:
+        return cache[1]
 
-    return allowed_reflection_list
+    (V_2, S11, S22, S33, S12, S23, S13) = crystal.lattice_dimensions
+    metric = np.array([[S11, S12, S13],
+                       [S12, S22, S23],
+                       [S13, S23, S33]])/V_2
+    one_over_d2 = np.einsum('ni,ij,nj->n', hkl, metric, hkl)
+    mask = (one_over_d2 > 0) & (np.asarray(wavelengths)[:, None]**2*one_over_d2/4 <= 1)
 
+    crystal.reachability = (key, mask)
+    return mask
 
-def sensitivity_calculation(crystal):
-    """Calculate sensitivity."""
-    reflection_list = [str(row[0]).replace(',', '').replace('(', '').replace(')', '')
-                       for row in crystal.reflections]
 
-    reflection_list_dis = [str(row[0]).replace(',', '').replace('(', '').replace(')', '')
-                       for row in crystal.reflections_dis]
+def evaluate_ref(crystal, atomic_info_list):
+    """Return the reflections geometrically feasible at every chosen edge.
 
-    length = int((crystal.E_stop - crystal.E_start)/crystal.E_step + 1)
+    crystal.reflections is left as it is; the mask of the feasible ones is
+    kept in crystal.reachable (see simulated_reflections).
+    """
+    wavelengths = [1.23984198e4/float(info[2]) for info in atomic_info_list]  # in angstroms
+    crystal.reachable = reachability_mask(crystal, wavelengths).all(axis=0)
+    return [reflection for reflection, reachable
+            in zip(crystal.reflections, crystal.reachable) if reachable]
 
-    intensity_matrix = np.zeros((len(reflection_list), length, crystal.filenumber)) # we make a matrix where we will keep the intensity values for both calculations. final range is for average
 
-    global dirfdmnes
-    os.chdir(Path(dirfdmnes, 'FileResults'))
-    for repetition in range(crystal.filenumber):
-        data = np.loadtxt(f'result_{repetition}_conv.txt', skiprows=1).T[2:]
-        intensity_matrix[:, :, repetition] = data
-    intensities = [np.mean(reflection_matrix).round(0)
-                   for reflection_matrix in intensity_matrix]
+def simulated_reflections(crystal):
+    """Reflections in the FDMNES inputs, and their display form."""
+    reachable = getattr(crystal, 'reachable', None)
+    if reachable is None or len(reachable) != len(crystal.reflections):
+        return crystal.reflections, crystal.reflections_dis
+    return ([row for row, ok in zip(crystal.reflections, reachable) if ok],
+            [row for row, ok in zip(crystal.reflections_dis, reachable) if ok])
 
-    # we define two types of sensitivities
-    sensitivity_matrix_N = [[[((repetition_value - np.mean(energy_value))/np.mean(energy_value))**2
-                            for repetition_value in energy_value]
-                            for energy_value in reflection_matrix]
-                            for reflection_matrix in intensity_matrix]
 
-    sensitivity_matrix_I = [[[(repetition_value - np.mean(energy_value))**2
-                            for repetition_value in energy_value]
-                            for energy_value in reflection_matrix]
-                            for reflection_matrix in intensity_matrix]
+def n_reflections(crystal):
+    """Number of reflections in the FDMNES inputs."""
+    reachable = getattr(crystal, 'reachable', None)
+    if reachable is None or len(reachable) != len(crystal.reflections):
+        return len(crystal.reflections)
+    return int(np.count_nonzero(reachable))
 
-    sensitivities_N = [np.mean(sensitivity_matrix)
-                       for sensitivity_matrix in sensitivity_matrix_N]
 
-    sensitivities_I = [np.mean(sensitivity_matrix).round(0)
-                       for sensitivity_matrix in sensitivity_matrix_I]
+class OnlineSensitivity:
+    """Accumulate the intensity statistics of the runs as they arrive.
+
+    Welford's algorithm is used for each (reflection, energy) point, so
+    only the running mean and the sum of squared deviations are kept and
+    the memory does not depend on the number of repetitions. If a cube
+    (reflection x energy x run) is given, every run is copied in it too.
+    """
 
+    def __init__(self, n_ref, energies, cube=None):
+        self.count = 0
+        self.mean = np.zeros((n_ref, len(energies)))
+        self.m2 = np.zeros((n_ref, len(energies)))
+        self.weights = energy_weights(np.asarray(energies))  # non-uniform grids
+        self.loaded = set()  # repetitions already accumulated
+        self.cube = cube
+
+    def add(self, data):
+        """Add the intensities (reflection x energy) of a single run."""
+        self.count += 1
+        delta = data - self.mean
+        self.mean += delta/self.count
+        self.m2 += delta*(data - self.mean)
+
+    def add_file(self, source, repetition):
+        """Add a result file, returns False if it is not (fully) written."""
+        if repetition in self.loaded:
+            return False
+        try:
+            data = np.loadtxt(source, skiprows=1, ndmin=2).T[2:]
+        except (OSError, ValueError):  # not there or still being written
+            return False
+        if data.shape != self.mean.shape:
+            return False
+
+        self.add(data)
+        self.loaded.add(repetition)
+        if self.cube is not None:
+            self.cube[:, :, repetition] = data
+        return True
+
+    def variance(self):
+        """Population variance over the accumulated repetitions."""
+        return self.m2/max(self.count, 1)
+
+    def ranking(self):
+        """Provisional intensities, sensitivities and weights (in %)."""
+        return moments_ranking(self.mean, self.variance(), self.weights)
+
+
+def moments_ranking(mean, variance, weights):
+    """Ranking from the intensity mean and variance (reflection x energy)."""
+    intensities = np.average(mean, axis=1, weights=weights).round(0)
+    sensitivities_I = np.average(variance, axis=1, weights=weights).round(0)
+    sensitivities_N = np.average(variance/mean**2, axis=1, weights=weights)
+    return normalise_ranking(intensities, sensitivities_I, sensitivities_N)
+
+
+def normalise_ranking(intensities, sensitivities_I, sensitivities_N):
+    """Normalise intensities and sensitivities and combine them in weights."""
     intensities = intensities/max(intensities)*100
     sensitivities_I = sensitivities_I/max(sensitivities_I)*100
     sensitivities_N = sensitivities_N/max(sensitivities_N)*100
 
-    weights_I = [sensitivities_I[i] * intensities[i]
-                 for i in range(len(sensitivities_I))]
-    weights_N = [sensitivities_N[i] * intensities[i]
-                 for i in range(len(sensitivities_N))]
+    weights_I = sensitivities_I * intensities
+    weights_N = sensitivities_N * intensities
 
     weights_I = weights_I/max(weights_I)*100
     weights_N = weights_N/max(weights_N)*100
+    return intensities, sensitivities_I, sensitivities_N, weights_I, weights_N
+
+
+def results_table(crystal, ranking):
+    """Build the results DataFrame from a ranking."""
+    import pandas as pd  # v1.4.2, loaded with the first results
+    reflection_list_dis = [str(row[0]).replace(',', '').replace('(', '').replace(')', '')
+                           for row in simulated_reflections(crystal)[1]]
+
+    return pd.DataFrame(list(zip(reflection_list_dis, *ranking)),
+                        columns=['Reflections', 'Intensities', 'Sensitivities', 'Sensitivities (I norm)', 'Weights', 'Weights (I normalised)'])
+
+
+def new_accumulator(crystal, keep=False):
+    """Create an empty accumulator for the current campaign.
+
+    With keep, the intensities of every run are kept in a cube as well.
+    """
+    cube = intensity_cube(crystal, crystal.filenumber) if keep else None
+    return OnlineSensitivity(n_reflections(crystal), energy_grid(crystal), cube)
+
+
+def intensity_cube(crystal, n_runs):
+    """Empty cube of intensities (reflection x energy x run).
+
+    It is a memory map on an anonymous temporary file in FileResults, so
+    it does not need to fit in RAM and the file is gone once it is closed.
+    """
+    return np.memmap(tempfile.TemporaryFile(dir=crystal.workspace.results), dtype=float,
+                     mode='w+', shape=(*result_shape(crystal), n_runs))
 
-    results = pd.DataFrame(list(zip(reflection_list_dis, intensities, sensitivities_I, sensitivities_N, weights_I, weights_N)),
-                           columns=['Reflections', 'Intensities', 'Sensitivities', 'Sensitivities (I norm)', 'Weights', 'Weights (I normalised)'])
 
-    results.to_csv(crystal.name + '_results.csv', sep = ',')
+def result_shape(crystal):
+    """Reflections and energies expected in every result file."""
+    return (n_reflections(crystal), len(energy_grid(crystal)))
+
+
+def energy_step(crystal):
+    """Energy step of the campaign, coarser at low fidelity."""
+    return crystal.E_step*FIDELITIES[getattr(crystal, 'fidelity', 'full')]['step']
+
+
+def energy_range(crystal):
+    """Values of the FDMNES Range block: E_start, step, E, step, ..., E_end.
+
+    The range is uniform unless an adaptive one has been set; at low
+    fidelity every step is made coarser.
+    """
+    segments = getattr(crystal, 'energy_range', None)
+    if segments is None:
+        return [crystal.E_start, energy_step(crystal), crystal.E_stop]
+
+    factor = FIDELITIES[getattr(crystal, 'fidelity', 'full')]['step']
+    return [value*factor if i % 2 else value for i, value in enumerate(segments)]
+
+
+def energy_grid(crystal):
+    """Energies computed by FDMNES for the Range of the campaign."""
+    segments = energy_range(crystal)
+    grid = []
+    for i in range(0, len(segments) - 2, 2):
+        start, step, end = segments[i:i + 3]
+        intervals = (end - start)/step  # rounded, 0.3/0.1 is 2.9999999999999996
+        if i + 3 == len(segments):  # the last segment includes its end
+            n_points = int(np.floor(intervals + 1e-6)) + 1
+        else:
+            n_points = int(np.ceil(intervals - 1e-6))
+        grid.extend(start + step*np.arange(n_points))
+    return np.array(grid)
+
+
+def energy_weights(energies):
+    """Width of the energy interval of each point, normalised to 1.
+
+    All the weights are equal on a uniform grid, so the weighted averages
+    are the plain ones.
+    """
+    if len(energies) < 2:
+        return np.ones(len(energies))
+    widths = np.empty(len(energies))
+    widths[1:-1] = (energies[2:] - energies[:-2])/2
+    widths[0], widths[-1] = energies[1] - energies[0], energies[-1] - energies[-2]
+    return widths/widths.sum()
+
+
+def adaptive_energy_range(crystal, coarse, fine_step=None, threshold=0.2):
+    """Energy range refined where the intensities change most.
+
+    coarse: a finished campaign on a coarser grid (e.g. the screening).
+    The relative variance across repetitions, added over the reflections,
+    is taken at each energy of the coarse grid. The intervals next to
+    points above threshold x maximum get the fine step (E_step by default),
+    the rest keep the coarse step. The range is set for the crystal.
+    """
+    fine_step = fine_step or crystal.E_step
+    accumulator = new_accumulator(coarse)
+    poll_results(coarse, accumulator)
+    mean = np.where(accumulator.mean == 0, 1, accumulator.mean)
+    profile = np.sum(accumulator.variance()/mean**2, axis=0)
+
+    energies = energy_grid(coarse)
+    sensitive = profile >= threshold*profile.max()
+    fine = sensitive[:-1] | sensitive[1:]  # for each coarse interval
+
+    segments = [float(energies[0])]
+    for interval in range(len(fine)):
+        step = fine_step if fine[interval] else energy_step(coarse)
+        if len(segments) > 1 and segments[-2] == step:  # same step, longer
+            segments[-1] = float(energies[interval + 1])
+        else:
+            segments += [step, float(energies[interval + 1])]
+    segments[-1] = max(segments[-1], crystal.E_stop)  # coarse grid may stop short
+    crystal.energy_range = segments
+    return segments
+
+
+def result_source(crystal, run):
+    """Result of a run, from FileResults or from the results archive."""
+    file_path = crystal.workspace.result_path(run)
+    archive = getattr(crystal, 'results_archive', None)
+    if archive is not None and not file_path.exists():
+        name = cm.result_name(crystal.run_keys[run])  # packed under its input key
+        if name in archive:
+            return archive.open(name)
+    return file_path
+
+
+def extract_inputs(crystal):
+    """Extract the inputs to be simulated from the input archive."""
+    if getattr(crystal, 'input_archive', None) is None:
+        return
+    for job in crystal.jobs:
+        crystal.input_archive.extract(f'input_{job}.txt', crystal.workspace.inputs)
+
+
+def pack_results(crystal):
+    """Move the finished results into the results archive.
+
+    They are packed under the key of their input, so that a later campaign
+    never reads the result of another input. The extracted inputs are
+    removed too, the archives keep everything.
+    """
+    if getattr(crystal, 'results_archive', None) is None:
+        return
+    fan_out_results(crystal)
+
+    shape = result_shape(crystal)
+    results_dir = crystal.workspace.results
+    archive = crystal.results_archive
+    for run in range(crystal.filenumber):
+        key = crystal.run_keys[run]
+        result = Path(results_dir, f'result_{run}_conv.txt')
+        if cm.valid_result(result, shape):
+            archive.add_file(result, cm.result_name(key))
+            raw = Path(results_dir, f'result_{run}.txt')  # unconvolved
+            if raw.exists():
+                archive.add_file(raw, cm.result_name(key, ''))
+    archive.close()
+
+    for run in range(crystal.filenumber):
+        key = crystal.run_keys[run]
+        for file_path, name in ((Path(results_dir, f'result_{run}_conv.txt'), cm.result_name(key)),
+                                (Path(results_dir, f'result_{run}.txt'), cm.result_name(key, ''))):
+            if file_path.exists() and name in archive:
+                os.remove(file_path)
+        input_path = crystal.workspace.input_path(run)
+        if input_path.exists():
+            os.remove(input_path)
+
+
+def raw_suffix(crystal):
+    """Suffix of the results kept in the store, raw if convolved here."""
+    return '' if getattr(crystal, 'python_convolution', False) else '_conv'
+
+
+def fan_out_results(crystal, done_runs=()):
+    """Copy the results of duplicated and already simulated inputs.
+
+    done_runs: runs already read, their results are not checked again.
+    """
+    if not getattr(crystal, 'python_convolution', False):
+        return cm.fan_out_results(crystal.run_keys, crystal.workspace.results,
+                                  crystal.workspace.store,
+                                  result_shape(crystal),
+                                  getattr(crystal, 'results_archive', None),
+                                  done_runs=done_runs)
+
+    # the raw outputs are shared, the _conv files are made from them
+    n_ref, n_energies = result_shape(crystal)
+
+    def valid(file_path):
+        return cv.valid_raw(file_path, n_energies, n_ref)
+
+    done = cm.fan_out_results(crystal.run_keys, crystal.workspace.results,
+                              crystal.workspace.store, (n_ref, n_energies),
+                              getattr(crystal, 'results_archive', None),
+                              suffix='', valid=valid, done_runs=done_runs)
+    reconvolve(crystal)
+    return done
+
+
+def raw_source(crystal, run):
+    """Raw output of a run, from FileResults or from the results archive."""
+    file_path = Path(crystal.workspace.results, f'result_{run}.txt')
+    archive = getattr(crystal, 'results_archive', None)
+    if archive is not None and not file_path.exists():
+        name = cm.result_name(crystal.run_keys[run], '')
+        if name in archive:
+            return archive.open(name)
+    return file_path
+
+
+def reconvolve(crystal, force=False, **broadening):
+    """Broaden the raw FDMNES outputs into the _conv results.
+
+    Only the runs without a _conv result are done, every run if "force"
+    (after a change of broadening). The broadening keywords (gamma_hole,
+    gamma_max, E_start, sigma) update crystal.broadening. All the spectra
+    are broadened in one matrix product. Returns the number of runs done.
+    """
+    crystal.broadening = {**BROADENING, 'E_start': crystal.E_start,
+                          **getattr(crystal, 'broadening', {}), **broadening}
+
+    n_ref, n_energies = result_shape(crystal)
+    archive = getattr(crystal, 'results_archive', None)
+    present = set(os.listdir(crystal.workspace.results))  # no stat for every run
+    runs, signals = [], []
+    for run in range(crystal.filenumber):
+        packed = archive is not None and cm.result_name(crystal.run_keys[run]) in archive
+        if not force and (f'result_{run}_conv.txt' in present or packed):
+            continue
+        if archive is None and f'result_{run}.txt' not in present:  # not simulated yet
+            continue
+        try:
+            energies, names, columns = cv.read_raw(raw_source(crystal, run))
+        except (OSError, ValueError, IndexError):  # not simulated yet
+            continue
+        if len(energies) != n_energies:  # still being written
+            continue
+        if columns.shape[0] < 1 + n_ref:  # stale, from fewer reflections
+            continue
+        xanes, signal = cv.spectra_from_raw(columns, n_ref)
+        runs.append(run)
+        signals.append(np.vstack((xanes, signal)))
+    if len(runs) == 0:
+        return 0
+
+    lorentz, gauss = cv.broadening_matrix(energies, **crystal.broadening)
+    signals = np.array(signals)
+    xanes = cv.convolve_spectra(signals[:, 0].real, lorentz, gauss)
+    intensities = cv.convolve_spectra(signals[:, 1:], lorentz, gauss)
+    for index, run in enumerate(runs):
+        cv.write_conv(crystal.workspace.result_path(run), energies, xanes[index],
+                      intensities[index], names[1:n_ref + 1])
+    return len(runs)
+
+
+def update_manifest(crystal, running=False):
+    """Check which runs have a valid result and record it in the manifest."""
+    fan_out_results(crystal)
+    status = cm.run_status([result_source(crystal, run) for run in range(len(crystal.run_keys))],
+                           result_shape(crystal), running)
+    cm.write_manifest(crystal.workspace.inputs, crystal.parameters, crystal.run_keys, status)
+    return status
+
+
+def resume_campaign(crystal):
+    """Relaunch FDMNES only for the missing or failed runs.
+
+    Runs sharing an input are simulated once, from the first of them.
+    Returns the FDMNES process, None if every run is done.
+    """
+    status = update_manifest(crystal)
+
+    first_run = {}  # first run of every input key
+    for run, key in enumerate(crystal.run_keys):
+        first_run.setdefault(key, run)
+    jobs = {first_run[key] for run, key in enumerate(crystal.run_keys) if status[run] != 'done'}
+    crystal.jobs = [int(job) for job in np.random.default_rng(0).permutation(sorted(jobs))]
+
+    instructions(crystal.workspace, crystal.jobs)
+    if len(crystal.jobs) == 0:
+        return None
+    extract_inputs(crystal)
+    return run_fdmnes(crystal.workspace)
+
+
+def fdmnes_progress(crystal):
+    """Number of simulations FDMNES has finished, and of simulations to do.
+
+    Only the result files are looked for, they are not read.
+    """
+    suffix = raw_suffix(crystal)
+    done = sum(Path(crystal.workspace.results, f'result_{job}{suffix}.txt').exists()
+               for job in crystal.jobs)
+    return done, len(crystal.jobs)
+
+
+def poll_results(crystal, accumulator, progress=None):
+    """Feed the accumulator with the results FDMNES has written so far.
+
+    It can be called at any time while FDMNES runs; it returns the number
+    of newly accumulated repetitions. The runs already accumulated and the
+    missing result files are not read. progress(done, total) is called for
+    each run, it can raise to cancel.
+    """
+    fan_out_results(crystal, accumulator.loaded)
+    present = set(os.listdir(crystal.workspace.results))  # no stat for every run
+    archive = getattr(crystal, 'results_archive', None)
+
+    new_results = 0
+    for repetition in range(crystal.filenumber):
+        if progress is not None:
+            progress(repetition, crystal.filenumber)
+        if repetition in accumulator.loaded:
+            continue
+        if archive is None and f'result_{repetition}_conv.txt' not in present:
+            continue  # not simulated yet
+        if accumulator.add_file(result_source(crystal, repetition), repetition):
+            new_results += 1
+    return new_results
+
+
+def provisional_results(crystal, accumulator):
+    """Results of the runs accumulated so far, FDMNES may be running."""
+    if accumulator.count == 0:
+        raise ValueError("No FDMNES results available yet.")
+    return results_table(crystal, accumulator.ranking())
+
+
+def ranking_stability(previous, current, top=10):
+    """Kendall tau between two weight rankings, over their top reflections."""
+    previous, current = np.asarray(previous), np.asarray(current)
+    index = np.union1d(np.argsort(previous)[::-1][:top],
+                       np.argsort(current)[::-1][:top])
+    if np.allclose(previous[index], current[index]):
+        return 1.0
+
+    from scipy.stats import kendalltau  # v1.7.3
+
+    tau = kendalltau(previous[index], current[index])[0]
+    return 0.0 if np.isnan(tau) else tau
+
+
+class RankingMonitor:
+    """Follow the stability of the reflection ranking between batches."""
+
+    def __init__(self, tolerance=0.95, top=10, patience=2):
+        self.tolerance = tolerance  # minimum tau for a stable batch
+        self.top = top  # number of reflections compared
+        self.patience = patience  # stable batches in a row needed
+        self.previous = None
+        self.stable = 0
+        self.history = []  # (runs, tau) for each batch
+
+    def update(self, weights, runs):
+        """Compare a new ranking with the previous one, True if converged."""
+        if self.previous is not None:
+            tau = ranking_stability(self.previous, weights, self.top)
+            self.history.append((runs, tau))
+            self.stable = self.stable + 1 if tau >= self.tolerance else 0
+        self.previous = np.asarray(weights)
+        return self.converged()
+
+    def converged(self):
+        """Check if the ranking has been stable for enough batches."""
+        return self.stable >= self.patience
+
+
+class CampaignMonitor:
+    """Follow the results of a running campaign until its ranking converges.
+
+    The ranking is compared each time "batch" new results are available.
+    FDMNES runs the jobs in a random order (see input_generator), so the
+    first results are a fair sample of the design.
+    """
+
+    def __init__(self, crystal, tolerance=0.95, top=10, batch=10, patience=2):
+        self.crystal = crystal
+        self.accumulator = new_accumulator(crystal)
+        self.monitor = RankingMonitor(tolerance, top, patience)
+        self.batch = batch
+        self.checked = 0  # runs included in the last comparison
+
+    def step(self, running=True, progress=None):
+        """Read the new results, True once the ranking has converged."""
+        poll_results(self.crystal, self.accumulator, progress)
+        new_results = self.accumulator.count - self.checked
+        if new_results >= self.batch or (not running and new_results > 0):
+            self.checked = self.accumulator.count
+            self.monitor.update(self.accumulator.ranking()[3], self.checked)
+        return self.monitor.converged()
+
+    def report(self):
+        """Number of runs done and saved."""
+        runs_done = self.accumulator.count
+        return {'runs done': runs_done,
+                'runs planned': self.crystal.filenumber,
+                'runs saved': self.crystal.filenumber - runs_done,
+                'fraction saved': 1 - runs_done/self.crystal.filenumber,
+                'converged': self.monitor.converged(),
+                'history': self.monitor.history}
+
+
+def early_stop_allowed(crystal):
+    """Check if the campaign can be stopped before all its runs are done."""
+    return getattr(crystal, 'sampling', None) not in COMPLETE_DESIGNS
+
+
+def monitor_campaign(crystal, process, tolerance=0.95, top=10, batch=10,
+                     patience=2, interval=5):
+    """Follow FDMNES and stop it once the weight ranking converges.
+
+    Designs whose estimator needs every run are followed to the end.
+    Returns a report with the number of runs done and saved.
+    """
+    monitor = CampaignMonitor(crystal, tolerance, top, batch, patience)
+    crystal.stopped_early = False
+    if not early_stop_allowed(crystal) and process is not None:
+        print(f'No early stop with the {crystal.sampling} design, every run is simulated.')
+        process.wait()
+    while True:
+        running = process is not None and process.poll() is None
+        if monitor.step(running) and running:
+            stop_fdmnes(process)
+            crystal.stopped_early = True
+            break
+
+        if not running or monitor.accumulator.count == crystal.filenumber:
+            break
+        time.sleep(interval)
+
+    update_manifest(crystal)
+    return monitor.report()
+
+
+def load_intensity_matrix(crystal, runs=None):
+    """Load the intensities of every repetition (reflection x energy x run).
+
+    The cube is a memory map (see intensity_cube), filled run by run as the
+    results are parsed.
+    """
+    runs = range(crystal.filenumber) if runs is None else runs
+    intensity_matrix = intensity_cube(crystal, len(runs))
+
+    fan_out_results(crystal)
+    for index, repetition in enumerate(runs):
+        intensity_matrix[:, :, index] = np.loadtxt(result_source(crystal, repetition),
+                                                   skiprows=1).T[2:]
+    return intensity_matrix
+
+
+def energy_blocks(length, block=ENERGY_BLOCK):
+    """Slices over the energies, to work on the cube a block at a time."""
+    return [slice(start, min(start + block, length)) for start in range(0, length, block)]
+
+
+def save_cube(crystal, runs=None, intensity_matrix=None):
+    """Keep the energy resolved intensities of the campaign.
+
+    They are written in FileResults as {name}_cube.npz, to be read with
+    cube_module.CubeReader. intensity_matrix is the cube of every run, as
+    kept by the accumulator, the runs are read from the results if None.
+    Returns the file path.
+    """
+    runs = list(range(crystal.filenumber)) if runs is None else sorted(runs)
+    columns = runs
+    if intensity_matrix is None:
+        intensity_matrix, columns = load_intensity_matrix(crystal, runs), None
+    file_path = Path(crystal.workspace.results, crystal.name + '_cube.npz')
+    cb.write_cube(file_path, intensity_matrix, energy_grid(crystal),
+                  [row[0] for row in simulated_reflections(crystal)[1]], crystal.parameters[runs],
+                  crystal.parameter_labels, runs=columns)
+    return file_path
+
+
+def difference_ranking(crystal, intensity_matrix=None):
+    """Ranking for the one-at-a-time and central difference designs.
+
+    The intensity changes are taken along the axis of each parameter,
+    around the unchanged structure (first run), and added over parameters.
+    The cube of every run is loaded from the results if not given.
+    """
+    if intensity_matrix is None:
+        intensity_matrix = load_intensity_matrix(crystal)
+    parameters = crystal.parameters
+    baseline = np.array(intensity_matrix[:, :, 0])
+
+    variance = np.zeros(baseline.shape)
+    for energies in energy_blocks(baseline.shape[1]):  # bounded memory
+        block = np.asarray(intensity_matrix[:, energies])
+        for param in range(parameters.shape[1]):
+            moved = np.flatnonzero(parameters[:, param] != 1)
+            if crystal.sampling == 'central':  # squared half difference
+                low = moved[parameters[moved, param] < 1][0]
+                high = moved[parameters[moved, param] > 1][0]
+                variance[:, energies] += ((block[:, :, high] - block[:, :, low])/2)**2
+            else:  # spread of the intensity along the axis
+                variance[:, energies] += np.var(block[:, :, np.append(0, moved)], axis=2)
+
+    return moments_ranking(baseline, variance, energy_weights(energy_grid(crystal)))
+
+
+def saltelli_layout(parameters):
+    """Return the base sample size and parameters of a saltelli design."""
+    n_runs, n_params = parameters.shape
+    n_base = n_runs//(n_params + 2)
+    if n_base*(n_params + 2) != n_runs:
+        raise ValueError("The parameters do not follow a saltelli design.")
+
+    A, B = parameters[:n_base], parameters[n_base:2*n_base]
+    for param in range(n_params):
+        AB = parameters[(2 + param)*n_base:(3 + param)*n_base]
+        expected = A.copy()
+        expected[:, param] = B[:, param]
+        if not np.allclose(AB, expected):
+            raise ValueError("The parameters do not follow a saltelli design.")
+    return n_base, n_params
+
+
+def sobol_indices(parameters, intensity_matrix, n_boot=200, confidence=0.95, seed=0,
+                  weights=None, block=ENERGY_BLOCK):
+    """First-order and total-effect Sobol indices per reflection and parameter.
+
+    parameters: sampled factors (run x parameter) of a saltelli design.
+    intensity_matrix: intensities (reflection x energy x run).
+
+    Saltelli (2010) and Jansen estimators are used at each energy and the
+    partial variances are added over the energies, so one index summarises
+    the whole spectrum of the reflection (weighted by the energy intervals
+    if weights are given). Confidence intervals come from bootstrapping the
+    base samples. The partial variances are added a block of energies at a
+    time, so the cube can be a memory map.
+    Returns S1, ST (reflection x parameter) and their intervals
+    (reflection x parameter x 2).
+    """
+    n_base, n_params = saltelli_layout(np.asarray(parameters))
+    n_ref, length = intensity_matrix.shape[:2]
+    weights = np.ones(length) if weights is None else np.asarray(weights)
+
+    def partial_variances(f_A, f_B, f_AB, weights, sample):
+        """Variance, first-order and total partial variances of a block."""
+        A, B, AB = f_A[:, :, sample], f_B[:, :, sample], f_AB[:, :, :, sample]
+        variance = np.var(np.concatenate((A, B), axis=2), axis=2) @ weights
+
+        V_first = np.einsum('rek,e->rk', np.mean(B[:, :, None, :]*(AB - A[:, :, None, :]), axis=3), weights)
+        V_total = np.einsum('rek,e->rk', 0.5*np.mean((A[:, :, None, :] - AB)**2, axis=3), weights)
+        return np.array([variance[:, None].repeat(n_params, axis=1), V_first, V_total])
+
+    rng = np.random.default_rng(seed)
+    samples = [np.arange(n_base)] + [rng.integers(0, n_base, n_base) for boot in range(n_boot)]
+
+    # sums over the energies, the estimate first and then the bootstraps
+    sums = np.zeros((n_boot + 1, 3, n_ref, n_params))
+    for energies in energy_blocks(length, block):
+        cube = np.asarray(intensity_matrix[:, energies])
+        f_A = cube[:, :, :n_base]
+        f_B = cube[:, :, n_base:2*n_base]
+        f_AB = cube[:, :, 2*n_base:].reshape(cube.shape[0], cube.shape[1], n_params, n_base)
+        for index, sample in enumerate(samples):
+            sums[index] += partial_variances(f_A, f_B, f_AB, weights[energies], sample)
+
+    variance = np.where(sums[:, 0] > 0, sums[:, 0], np.inf)
+    S1, ST = sums[0, 1]/variance[0], sums[0, 2]/variance[0]
+    boot_S1, boot_ST = sums[1:, 1]/variance[1:], sums[1:, 2]/variance[1:]
+
+    limits = [50*(1 - confidence), 50*(1 + confidence)]
+    S1_conf = np.moveaxis(np.percentile(boot_S1, limits, axis=0), 0, -1)
+    ST_conf = np.moveaxis(np.percentile(boot_ST, limits, axis=0), 0, -1)
+    return S1, ST, S1_conf, ST_conf
+
+
+def sobol_calculation(crystal):
+    """Calculate the Sobol indices of a saltelli campaign."""
+    import pandas as pd  # v1.4.2
+    S1, ST, S1_conf, ST_conf = sobol_indices(crystal.parameters,
+                                             load_intensity_matrix(crystal),
+                                             weights=energy_weights(energy_grid(crystal)))
+
+    reflection_list_dis = [str(row[0]).replace(',', '').replace('(', '').replace(')', '')
+                           for row in simulated_reflections(crystal)[1]]
+    rows = [(reflection, label, S1[i, j], *S1_conf[i, j], ST[i, j], *ST_conf[i, j])
+            for i, reflection in enumerate(reflection_list_dis)
+            for j, label in enumerate(crystal.parameter_labels)]
+
+    sobol = pd.DataFrame(rows, columns=['Reflections', 'Parameter', 'S1', 'S1 low', 'S1 high', 'ST', 'ST low', 'ST high'])
+    sobol.to_csv(Path(crystal.workspace.results, crystal.name + '_sobol.csv'), sep=',')
+    return sobol
+
+
+def screening_stage(crystal):
+    """Copy of the crystal for a low-fidelity pass over every reflection.
+
+    It runs through input_generator, FDMNES and sensitivity_calculation as
+    any campaign, in its own folders.
+    """
+    workspace = get_workspace(crystal)
+    stage = copy.copy(crystal)  # reflections are shared, never changed
+    stage.fidelity = 'low'
+    stage.samples = None
+    stage.workspace = cm.Workspace(workspace.root, workspace.fdmnes,
+                                   crystal.name, 'screening', workspace.run_dir)
+    return stage
+
+
+def refinement_stage(crystal, screening, top=10, points=None, adaptive=False):
+    """Copy of the crystal to re-run the best of a screening at full fidelity.
+
+    Only the "top" reflections with the highest screening weights are kept,
+    and the "points" parameter sets which changed them the most (all if
+    None), together with the set closest to the unchanged structure.
+    With adaptive, the fine energy step is only used where the screening
+    intensities change most.
+    """
+    ranking = new_accumulator(screening, keep=points is not None)
+    poll_results(screening, ranking)
+    weights = ranking.ranking()[3]
+    best = np.sort(np.argsort(weights)[::-1][:top])
+
+    runs = sorted(ranking.loaded)  # all but the pending ones after an early stop
+    parameters = screening.parameters[runs]
+    if points is not None and points < len(parameters):
+        # deviation of each run from the mean, on the best reflections
+        intensity_matrix = ranking.cube[best][:, :, runs]
+        mean = np.mean(intensity_matrix, axis=2, keepdims=True)
+        deviation = np.mean(((intensity_matrix - mean)/np.where(mean == 0, 1, mean))**2,
+                            axis=(0, 1))
+        chosen = set(np.argsort(deviation)[::-1][:points - 1])
+        chosen.add(int(np.argmin(np.abs(parameters - 1).sum(axis=1))))
+        parameters = parameters[sorted(chosen)]
+
+    reflections, reflections_dis = simulated_reflections(screening)
+    stage = copy.copy(crystal)
+    stage.reflections = [reflections[i] for i in best]
+    stage.reflections_dis = [reflections_dis[i] for i in best]
+    stage.reachable = None
+    stage.fidelity = 'full'
+    stage.samples = parameters
+    stage.workspace = get_workspace(crystal)
+    if adaptive:
+        adaptive_energy_range(stage, screening)
+    return stage
+
+
+def merge_fidelities(crystal, screening_results, refinement_results):
+    """Final ranking from the screening and the full-fidelity results.
+
+    The refined reflections take their full-fidelity values, scaled so that
+    both passes agree on their maximum; the others keep the screening ones.
+    """
+    merged = screening_results.copy()
+    merged['Fidelity'] = 'low'
+    rows = merged['Reflections'].isin(refinement_results['Reflections'])
+    refined = refinement_results.set_index('Reflections').loc[merged.loc[rows, 'Reflections']]
+
+    for column in ('Intensities', 'Sensitivities', 'Sensitivities (I norm)'):
+        scale = merged.loc[rows, column].max()/max(refined[column].max(), 1e-12)
+        merged.loc[rows, column] = refined[column].values*scale
+    merged.loc[rows, 'Fidelity'] = 'full'
+
+    ranking = normalise_ranking(merged['Intensities'].values,
+                                merged['Sensitivities'].values,
+                                merged['Sensitivities (I norm)'].values)
+    merged[['Intensities', 'Sensitivities', 'Sensitivities (I norm)', 'Weights',
+            'Weights (I normalised)']] = np.array(ranking).T
+
+    merged.to_csv(Path(get_workspace(crystal).results, crystal.name + '_results.csv'), sep=',')
+    return merged
+
+
+def fit_surrogate(crystal, degree=2):
+    """Fit a surrogate of the intensities to the finished campaign.
+
+    Only the runs with a result are used, after an early stop too. It is
+    kept in crystal.surrogate; its relative leave-one-out error is in
+    crystal.surrogate.error.
+    """
+    accumulator = new_accumulator(crystal, keep=True)
+    poll_results(crystal, accumulator)
+    runs = sorted(accumulator.loaded)
+    try:
+        crystal.surrogate = sg.Surrogate(degree).fit(crystal.parameters[runs],
+                                                    accumulator.cube[:, :, runs])
+    except ValueError as error:
+        missing = sorted(set(range(crystal.filenumber)) - accumulator.loaded)
+        if len(missing) == 0:
+            raise
+        shown = ', '.join(str(run) for run in missing[:10]) + (', ...' if len(missing) > 10 else '')
+        raise ValueError(f"{error} {len(missing)} runs have no result: {shown}.") from error
+    return crystal.surrogate
+
+
+def surrogate_ranking(crystal, percentage=None, design='sobol', n_runs=1024):
+    """Ranking for another % variation, predicted by the surrogate.
+
+    The factors are sampled as in a campaign with the given design, and
+    the statistics taken over the predicted intensities.
+    """
+    if getattr(crystal, 'surrogate', None) is None:
+        fit_surrogate(crystal)
+    percentage = crystal.percent if percentage is None else percentage
+
+    Repetitions = crystal.nsym + (crystal.nsym % 2 + 1)
+    factors = np.array(sampling_design(design, crystal.parameters.shape[1],
+                                       Repetitions, percentage, n_runs))
+    if not np.all(crystal.surrogate.inside(factors)):
+        print('Warning: the surrogate is extrapolated beyond the simulated range.')
+
+    intensity_matrix = crystal.surrogate.predict(factors)
+    ranking = moments_ranking(intensity_matrix.mean(axis=2), intensity_matrix.var(axis=2),
+                              energy_weights(energy_grid(crystal)))
+    return results_table(crystal, ranking)
+
+
+def sensitivity_calculation(crystal, progress=None):
+    """Calculate sensitivity, progress(done, total) can raise to cancel."""
+    crystal.surrogate = None  # fitted to the previous results, if any
+    accumulator = new_accumulator(crystal, keep=True)  # results are read once
+    poll_results(crystal, accumulator, progress)
+
+    # after an early stop only the finished runs are considered
+    missing = crystal.filenumber - accumulator.count
+    if missing > 0 and not early_stop_allowed(crystal):
+        raise FileNotFoundError(f"{missing} FDMNES results are missing or incomplete, "
+                                f"the {crystal.sampling} design needs every run.")
+    if missing > 0 and not getattr(crystal, 'stopped_early', False):
+        raise FileNotFoundError(f"{missing} FDMNES results are missing or incomplete.")
+
+    if crystal.sampling in ('oat', 'central'):
+        ranking = difference_ranking(crystal, accumulator.cube)
+    else:  # variance over the sampled runs
+        ranking = accumulator.ranking()
+
+    results = results_table(crystal, ranking)
+    save_cube(crystal, accumulator.loaded, accumulator.cube)  # per energy information
+    pack_results(crystal)  # only with the archive option
+
+    results.to_csv(Path(crystal.workspace.results, crystal.name + '_results.csv'), sep = ',')
     return results
 
 
@@ -0,0 +1,186 @@
+"""
+BSD 3-Clause License.
+
+Copyright (c) 2022 CNRS - Université de Strasbourg.
+All rights reserved.
+
+Author : [Antonio Pena Corredor] [antonio.penacorredor@ipcmss.unistra.fr]
+
+This software is a reflection choice framework for Resonant Elastic X-ray Scattering.
+The program consists of different ".py" modules and a "GUI.ui" graphic interface.
+- main.py: backbone, direct exchange with interface.
+- intensity module.py: module for the calculation of the reflection intensities.
+- sensitivity module.py: module for the calculation of the reflection sensitivities.
+- campaign module.py: module for the bookkeeping of the FDMNES campaigns.
+- convolution module.py: module for the broadening of the FDMNES spectra.
+- surrogate module.py: module for the surrogate model of the FDMNES intensities.
+- cube module.py: module for the storage of the energy resolved results.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+* Redistributions of source code must retain the above copyright notice, this
+  list of conditions and the following disclaimer.
+
+* Redistributions in binary form must reproduce the above copyright notice,
+  this list of conditions and the following disclaimer in the documentation
+  and/or other materials provided with the distribution.
+
+* Neither the name of the copyright holder nor the names of its
+  contributors may be used to endorse or promote products derived from
+  this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+The program has been coded and tested on python 3.9
+The version is indicated for those modules not included in the standard Python library
+
+Module for the sessions of the program.
+
+A session keeps the parsed crystal, its symmetry operations, the
+reflections, the campaign (sampled parameters, input keys, manifest) and
+the results in a single npz file. The arrays are stored in binary form,
+the rest as JSON in the same file, so a session is read without pickle
+and without parsing the cif file or calculating anything again.
+"""
+import json
+from pathlib import Path
+import numpy as np  # v1.21.5
+
+# Own modules, to be placed in same folder:
+import campaign_module as cm
+
+VERSION = 1
+
+# crystal attributes stored as JSON
+FIELDS = ('name', 'a', 'b', 'c', 'alpha', 'beta', 'gamma', 'spacegroup', 'setting',
+          'sgnumber', 'hex', 'atom_list', 'n', 'operation_list', 'nsym', 'maxhkl',
+          'forbidden', 'edge_checked_list', 'refinement_checked_list', 'E_start',
+          'E_stop', 'E_step', 'percent', 'coupled', 'archive', 'python_convolution',
+          'nsim', 'design', 'sampling', 'filenumber', 'jobs', 'run_keys',
+          'parameter_labels', 'energy_range', 'broadening', 'stopped_early',
+          'normalised')
+
+# crystal attributes stored as arrays
+ARRAYS = ('lattice_dimensions', 'parameters', 'reachable')
+
+# crystal attributes holding a DataFrame
+TABLES = ('results', 'sobol')
+
+
+def session_path(directory, name):
+    """Session file of a crystal."""
+    return Path(directory, 'Sessions', f'{name}_session.npz')
+
+
+def to_json(value):
+    """JSON form of the numpy values and paths."""
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, Path):
+        return str(value)
+    raise TypeError(f'{type(value).__name__} cannot be saved in a session.')
+
+
+def reflection_arrays(reflections):
+    """Miller indices (reflection x 3 or 4) and intensities of a reflection list."""
+    hkl = np.array([row[0] for row in reflections], dtype=int).reshape(len(reflections), -1)
+    intensities = np.array([row[1] for row in reflections], dtype=float)
+    return hkl, intensities
+
+
+def reflection_list(hkl, intensities):
+    """Reflection list [((h, k, l), I), ...] from its arrays."""
+    return [(tuple(int(index) for index in row), float(intensity))
+            for row, intensity in zip(hkl, intensities)]
+
+
+def save_session(crystal, file_path, interface=None):
+    """Save the crystal and its results; interface: state of the widgets."""
+    metadata = {'version': VERSION, 'interface': interface or {}, 'tables': {},
+                'crystal': {field: getattr(crystal, field) for field in FIELDS
+                            if getattr(crystal, field, None) is not None}}
+    arrays = {field: np.asarray(getattr(crystal, field)) for field in ARRAYS
+              if getattr(crystal, field, None) is not None}
+
+    for field in ('reflections', 'reflections_dis'):
+        if getattr(crystal, field, None) is not None:
+            arrays[field + '_hkl'], arrays[field + '_I'] = reflection_arrays(getattr(crystal, field))
+
+    for field in TABLES:
+        table = getattr(crystal, field, None)
+        if table is None:
+            continue
+        metadata['tables'][field] = [str(column) for column in table.columns]
+        for i, column in enumerate(table.columns):
+            values = table[column].to_numpy()
+            arrays[f'{field}_{i}'] = values.astype(str) if values.dtype == object else values
+
+    workspace = getattr(crystal, 'workspace', None)
+    if workspace is not None:
+        metadata['workspace'] = {'root': workspace.root, 'fdmnes_dir': workspace.fdmnes,
+                                 'name': workspace.name, 'stage': workspace.stage,
+                                 'run_dir': workspace.run_dir}
+        metadata['manifest'] = cm.read_manifest(workspace.inputs)
+        metadata['archives'] = {field: getattr(crystal, field).path for field
+                                in ('input_archive', 'results_archive')
+                                if getattr(crystal, field, None) is not None}
+
+    file_path = Path(file_path)
+    file_path.parent.mkdir(parents=True, exist_ok=True)
+    temporary = file_path.with_suffix('.tmp.npz')
+    np.savez(temporary, metadata=np.array(json.dumps(metadata, default=to_json)), **arrays)
+    temporary.replace(file_path)  # a crash never leaves half a session
+    return file_path
+
+
+def load_session(crystal, file_path):
+    """Restore a session in the crystal, returns the state of the widgets."""
+    with np.load(file_path) as session:
+        metadata = json.loads(str(session['metadata']))
+        if metadata['version'] != VERSION:
+            raise ValueError(f'Session version {metadata["version"]} is not supported.')
+
+        for field, value in metadata['crystal'].items():
+            setattr(crystal, field, value)
+        if 'atom_list' in metadata['crystal']:
+            crystal.atom_list = [tuple(atom) for atom in crystal.atom_list]
+
+        for field in ARRAYS:
+            if field in session:
+                setattr(crystal, field, session[field])
+        if hasattr(crystal, 'lattice_dimensions'):
+            crystal.lattice_dimensions = tuple(crystal.lattice_dimensions.tolist())
+
+        for field in ('reflections', 'reflections_dis'):
+            if field + '_hkl' in session:
+                setattr(crystal, field, reflection_list(session[field + '_hkl'],
+                                                        session[field + '_I']))
+
+        if metadata['tables']:
+            import pandas as pd  # v1.4.2, only for sessions with results
+        for field, columns in metadata['tables'].items():
+            setattr(crystal, field, pd.DataFrame({column: session[f'{field}_{i}']
+                                                  for i, column in enumerate(columns)}))
+
+    if 'workspace' in metadata:
+        crystal.workspace = cm.Workspace(**metadata['workspace'])
+        manifest = metadata['manifest']
+        if manifest is not None and crystal.workspace.inputs.is_dir() \
+                and cm.read_manifest(crystal.workspace.inputs) is None:
+            cm.write_manifest(crystal.workspace.inputs, crystal.parameters, crystal.run_keys,
+                              [run['status'] for run in manifest['runs']])
+        for field, path in metadata['archives'].items():
+            setattr(crystal, field, cm.Archive(path))
+    return metadata['interface']
@@ -0,0 +1,104 @@
+"""
+BSD 3-Clause License.
+
+Copyright (c) 2022 CNRS - Université de Strasbourg.
+All rights reserved.
+
+Author : [Antonio Pena Corredor] [antonio.penacorredor@ipcms.unistra.fr]
+
+This software is a reflection choice framework for Resonant Elastic X-ray Scattering.
+The program consists of three different ".py" modules and a "GUI.ui" graphic interface.
+- main.py: backbone, direct exchange with interface.
+- intensity module.py: module for the calculation of the reflection intensities.
+- sensitivity module.py: module for the calculation of the reflection sensitivities.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+* Redistributions of source code must retain the above copyright notice, this
+  list of conditions and the following disclaimer.
+
+* Redistributions in binary form must reproduce the above copyright notice,
+  this list of conditions and the following disclaimer in the documentation
+  and/or other materials provided with the distribution.
+
+* Neither the name of the copyright holder nor the names of its
+  contributors may be used to endorse or promote products derived from
+  this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+The program has been coded and tested on python 3.9
+The version is indicated for those modules not included in the standard Python library
+
+Startup benchmark.
+
+main.py is imported in a fresh interpreter, as a launch does before the
+window appears. The benchmark fails if it takes longer than the budget or
+if one of the heavy modules, loaded only by the stages that need them, is
+imported at startup.
+
+Usage: python startup_benchmark.py [--budget 1.5] [--repeat 5]
+"""
+
+import argparse
+import subprocess
+import sys
+from pathlib import Path
+
+# modules that must not be imported before the window appears
+LAZY = ('matplotlib', 'seaborn', 'pyxtal', 'CifFile', 'sympy', 'scipy',
+        'pandas', 'promptlib')
+
+CODE = """
+import sys, time
+start = time.perf_counter()
+import main
+print(time.perf_counter() - start)
+print(' '.join(sys.modules))
+"""
+
+
+def measure():
+    """Import time of main.py (s) and the modules it loaded."""
+    output = subprocess.run([sys.executable, '-c', CODE], capture_output=True, text=True,
+                            cwd=Path(__file__).resolve().parent, check=True).stdout
+    duration, modules = output.strip().splitlines()[-2:]
+    return float(duration), set(modules.split())
+
+
+def main(arguments=None):
+    """Run the benchmark, returns the exit code."""
+    parser = argparse.ArgumentParser(description='Startup time of the GUI.')
+    parser.add_argument('--budget', type=float, default=1.5,
+                        help='maximum import time of main.py (s)')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='launches measured, the fastest is kept')
+    args = parser.parse_args(arguments)
+
+    durations, modules = [], set()
+    for launch in range(args.repeat):
+        duration, loaded = measure()
+        durations.append(duration)
+        modules |= loaded
+
+    eager = sorted(package for package in LAZY
+                   if any(module.split('.')[0] == package for module in modules))
+    duration = min(durations)
+    print(f'Startup: {duration:.3f} s (budget {args.budget:.3f} s)')
+    if eager:
+        print('Imported at startup: ' + ', '.join(eager))
+    return 1 if eager or duration > args.budget else 0
+
+
+if __name__ == '__main__':  # only executes the below code if  main
+    sys.exit(main())
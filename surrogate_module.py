@@ -0,0 +1,121 @@
+"""
+BSD 3-Clause License.
+
+Copyright (c) 2022 CNRS - Université de Strasbourg.
+All rights reserved.
+
+Author : [Antonio Pena Corredor] [antonio.penacorredor@ipcmss.unistra.fr]
+
+This software is a reflection choice framework for Resonant Elastic X-ray Scattering.
+The program consists of different ".py" modules and a "GUI.ui" graphic interface.
+- main.py: backbone, direct exchange with interface.
+- intensity module.py: module for the calculation of the reflection intensities.
+- sensitivity module.py: module for the calculation of the reflection sensitivities.
+- campaign module.py: module for the bookkeeping of the FDMNES campaigns.
+- convolution module.py: module for the broadening of the FDMNES spectra.
+- surrogate module.py: module for the surrogate model of the FDMNES intensities.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+* Redistributions of source code must retain the above copyright notice, this
+  list of conditions and the following disclaimer.
+
+* Redistributions in binary form must reproduce the above copyright notice,
+  this list of conditions and the following disclaimer in the documentation
+  and/or other materials provided with the distribution.
+
+* Neither the name of the copyright holder nor the names of its
+  contributors may be used to endorse or promote products derived from
+  this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+The program has been coded and tested on python 3.9
+The version is indicated for those modules not included in the standard Python library
+
+Module for the surrogate model of the FDMNES intensities.
+
+A polynomial response surface in the refined parameters is fitted to the
+intensities of a finished campaign, so that the intensities at new
+parameter values are predicted without running FDMNES. The intensities of
+all reflections and energies are compressed with a principal component
+analysis and every component is fitted in a single least squares.
+"""
+from itertools import combinations_with_replacement
+import numpy as np  # v1.21.5
+
+
+class Surrogate:
+    """Polynomial response surface of the intensities (reflection x energy).
+
+    The factors are the ones applied to the refined parameters (runs x
+    parameters), the intensities the cube of the campaign (reflection x
+    energy x run). The components keep the given fraction of the variance.
+    """
+
+    def __init__(self, degree=2, variance=0.999):
+        self.degree = degree
+        self.variance = variance
+
+    def features(self, factors):
+        """Polynomial terms of the scaled factors (runs x terms)."""
+        scaled = (np.atleast_2d(factors) - self.center)/self.scale
+        columns = [np.ones(len(scaled))]
+        for order in range(1, self.degree + 1):
+            for terms in combinations_with_replacement(range(scaled.shape[1]), order):
+                columns.append(np.prod(scaled[:, terms], axis=1))
+        return np.column_stack(columns)
+
+    def fit(self, factors, intensity_matrix):
+        """Fit the surrogate and its leave-one-out error."""
+        factors = np.asarray(factors, dtype=float)
+        self.shape = intensity_matrix.shape[:2]
+        self.bounds = factors.min(axis=0), factors.max(axis=0)
+        self.center = factors.mean(axis=0)
+        self.scale = np.where(np.ptp(factors, axis=0) > 0, np.ptp(factors, axis=0)/2, 1)
+
+        X = self.features(factors)
+        if X.shape[1] >= len(factors):
+            raise ValueError(f"{len(factors)} runs are not enough for {X.shape[1]} "
+                             f"terms of degree {self.degree}.")
+
+        # principal components of the spectra (runs x points)
+        Y = intensity_matrix.reshape(-1, len(factors)).T
+        self.mean = Y.mean(axis=0)
+        _, singular, components = np.linalg.svd(Y - self.mean, full_matrices=False)
+        explained = np.cumsum(singular**2)/max(np.sum(singular**2), 1e-300)
+        n_comp = int(np.searchsorted(explained, self.variance) + 1)
+        self.components = components[:n_comp]
+
+        scores = (Y - self.mean) @ self.components.T
+        self.coefficients = np.linalg.lstsq(X, scores, rcond=None)[0]
+
+        # leave-one-out residuals from the hat matrix (PRESS)
+        leverage = np.sum(X*np.linalg.pinv(X).T, axis=1)
+        residuals = (Y - self.mean - X @ self.coefficients @ self.components)
+        loo = residuals/(1 - leverage)[:, None]
+        self.error = np.sqrt(np.mean(loo**2))/max(np.std(Y), 1e-300)  # relative RMSE
+        self.error_map = np.sqrt(np.mean(loo**2, axis=0)).reshape(self.shape)
+        return self
+
+    def predict(self, factors):
+        """Predicted intensities (reflection x energy x run)."""
+        X = self.features(factors)
+        Y = self.mean + X @ self.coefficients @ self.components
+        return Y.T.reshape(*self.shape, len(X))
+
+    def inside(self, factors):
+        """Check which factor sets lie within the fitted range."""
+        factors = np.atleast_2d(factors)
+        return np.all((factors >= self.bounds[0] - 1e-9)
+                      & (factors <= self.bounds[1] + 1e-9), axis=1)
@@ -0,0 +1,147 @@
+"""
+BSD 3-Clause License.
+
+Copyright (c) 2022 CNRS - Université de Strasbourg.
+All rights reserved.
+
+Author : [Antonio Pena Corredor] [antonio.penacorredor@ipcmss.unistra.fr]
+
+This software is a reflection choice framework for Resonant Elastic X-ray Scattering.
+The program consists of different ".py" modules and a "GUI.ui" graphic interface.
+- main.py: backbone, direct exchange with interface.
+- intensity module.py: module for the calculation of the reflection intensities.
+- sensitivity module.py: module for the calculation of the reflection sensitivities.
+- campaign module.py: module for the bookkeeping of the FDMNES campaigns.
+- convolution module.py: module for the broadening of the FDMNES spectra.
+- surrogate module.py: module for the surrogate model of the FDMNES intensities.
+- cube module.py: module for the storage of the energy resolved results.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+* Redistributions of source code must retain the above copyright notice, this
+  list of conditions and the following disclaimer.
+
+* Redistributions in binary form must reproduce the above copyright notice,
+  this list of conditions and the following disclaimer in the documentation
+  and/or other materials provided with the distribution.
+
+* Neither the name of the copyright holder nor the names of its
+  contributors may be used to endorse or promote products derived from
+  this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+The program has been coded and tested on python 3.9
+The version is indicated for those modules not included in the standard Python library
+
+Module for the table of reflections.
+
+The reflections are kept in numpy arrays behind a model, and the view
+only asks for the cells it shows, so the display time does not depend on
+the number of reflections. Sorting and filtering reorder an array of row
+numbers with numpy, never the data.
+"""
+import numpy as np  # v1.21.5
+from PyQt5 import QtCore  # v5.14.4
+
+HEADERS = ('Reflection', 'Intensity', 'θ (°)', 'd (Å)')
+FORMATS = (None, '{:.1f}', '{:.3f}', '{:.4f}')
+
+
+class ReflectionModel(QtCore.QAbstractTableModel):
+    """Reflections, intensities, Bragg angles and d-spacings for a QTableView."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.labels = np.array([], dtype=str)
+        self.values = np.zeros((3, 0))  # intensity, angle, d per reflection
+        self.hkl_order = np.arange(0)  # rank of each reflection sorted by hkl
+        self.rows = np.arange(0)  # reflections shown, in display order
+        self.pattern = ''
+        self.sort_column, self.sort_order = -1, QtCore.Qt.AscendingOrder
+
+    def set_reflections(self, reflections, angles, distances):
+        """Show a new reflection list [(hkl, I), ...]."""
+        self.beginResetModel()
+        self.labels = np.array([str(row[0]).replace(',', '') for row in reflections], dtype=str)
+        self.values = np.array([[row[1] for row in reflections], angles, distances],
+                               dtype=float).reshape(3, len(reflections))
+        hkl = np.array([row[0] for row in reflections], dtype=int).reshape(len(reflections), -1)
+        self.hkl_order = np.argsort(np.lexsort(hkl.T[::-1]))
+        self.update_rows()
+        self.endResetModel()
+
+    def set_filter(self, pattern):
+        """Show only some reflections.
+
+        ">10" or "<10" filters on the intensity, any other text keeps the
+        reflections whose label contains it, e.g. "0 0" or "(2".
+        """
+        self.beginResetModel()
+        self.pattern = pattern.strip()
+        self.update_rows()
+        self.endResetModel()
+
+    def update_rows(self):
+        """Row numbers shown, after the filter and the sort."""
+        keep = np.ones(len(self.labels), dtype=bool)
+        if self.pattern[:1] in ('>', '<') and len(self.pattern) > 1:
+            try:
+                threshold = float(self.pattern[1:])
+            except ValueError:  # incomplete number while typing
+                threshold = None
+            if threshold is not None:
+                keep = (self.values[0] > threshold if self.pattern[0] == '>'
+                        else self.values[0] < threshold)
+        elif self.pattern:
+            keep = np.char.find(self.labels, self.pattern) >= 0
+        rows = np.flatnonzero(keep)
+
+        if self.sort_column >= 0:
+            key = self.hkl_order if self.sort_column == 0 else self.values[self.sort_column - 1]
+            rows = rows[np.argsort(key[rows], kind='stable')]
+            if self.sort_order == QtCore.Qt.DescendingOrder:
+                rows = rows[::-1]
+        self.rows = rows
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        """Number of reflections shown."""
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QtCore.QModelIndex()):
+        """Number of columns."""
+        return 0 if parent.isValid() else len(HEADERS)
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        """Text of a cell, only called for the visible ones."""
+        if role == QtCore.Qt.TextAlignmentRole:
+            return QtCore.Qt.AlignCenter
+        if role != QtCore.Qt.DisplayRole or not index.isValid():
+            return None
+        row = self.rows[index.row()]
+        if index.column() == 0:
+            return str(self.labels[row])
+        return FORMATS[index.column()].format(self.values[index.column() - 1, row])
+
+    def headerData(self, section, orientation, role=QtCore.Qt.DisplayRole):
+        """Column names."""
+        if role == QtCore.Qt.DisplayRole and orientation == QtCore.Qt.Horizontal:
+            return HEADERS[section]
+        return super().headerData(section, orientation, role)
+
+    def sort(self, column, order=QtCore.Qt.AscendingOrder):
+        """Sort by a column, -1 for the calculated order."""
+        self.beginResetModel()
+        self.sort_column, self.sort_order = column, order
+        self.update_rows()
+        self.endResetModel()
@@ -0,0 +1,132 @@
+"""
+BSD 3-Clause License.
+
+Copyright (c) 2022 CNRS - Université de Strasbourg.
+All rights reserved.
+
+Author : [Antonio Pena Corredor] [antonio.penacorredor@ipcms.unistra.fr]
+
+This software is a reflection choice framework for Resonant Elastic X-ray Scattering.
+The program consists of three different ".py" modules and a "GUI.ui" graphic interface.
+- main.py: backbone, direct exchange with interface.
+- intensity module.py: module for the calculation of the reflection intensities.
+- sensitivity module.py: module for the calculation of the reflection sensitivities.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+* Redistributions of source code must retain the above copyright notice, this
+  list of conditions and the following disclaimer.
+
+* Redistributions in binary form must reproduce the above copyright notice,
+  this list of conditions and the following disclaimer in the documentation
+  and/or other materials provided with the distribution.
+
+* Neither the name of the copyright holder nor the names of its
+  contributors may be used to endorse or promote products derived from
+  this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+The program has been coded and tested on python 3.9
+The version is indicated for those modules not included in the standard Python library
+
+User interface cache.
+
+uic.loadUiType parses the XML of a .ui file and generates its classes at
+every launch. The .ui files are compiled once to Python modules in the
+UI_cache folder, next to this file, and only compiled again when the .ui
+file changes: the hash of its content is compared with the recorded one,
+so a checkout or a copy that keeps an older modification time is seen.
+
+Build step: python ui_cache.py compiles every .ui file of the folder.
+"""
+
+import hashlib
+import importlib.util
+import io
+import sys
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from PyQt5 import QtWidgets, uic  # v5.14.4
+
+home = Path(__file__).resolve().parent  # the .ui files live with the modules
+cache_dir = Path(home, 'UI_cache')
+
+
+def ui_hash(ui_path):
+    """sha256 of the .ui file."""
+    return hashlib.sha256(Path(ui_path).read_bytes()).hexdigest()
+
+
+def cache_path(ui_path):
+    """Compiled module of a .ui file."""
+    return Path(cache_dir, Path(ui_path).stem + '_ui.py')
+
+
+def cached_key(module_path):
+    """Hash and base class recorded in the first line of a compiled module."""
+    with open(module_path) as f:
+        line = f.readline().split()
+    if len(line) != 4 or line[:2] != ['#', 'ui_cache']:
+        return None, None
+    return line[2], line[3]
+
+
+def compile_ui(ui_path):
+    """Compiles a .ui file into the cache, returns the module path."""
+    ui_path = Path(ui_path)
+    base = ET.parse(ui_path).getroot().find('widget').get('class')
+    code = io.StringIO()
+    uic.compileUi(str(ui_path), code)
+
+    module_path = cache_path(ui_path)
+    cache_dir.mkdir(exist_ok=True)
+    temporary = module_path.with_suffix('.tmp')
+    with open(temporary, 'w') as f:
+        f.write(f'# ui_cache {ui_hash(ui_path)} {base}\n')
+        f.write(code.getvalue())
+    temporary.replace(module_path)  # never leaves a half written module
+    return module_path
+
+
+def compiled(ui_path):
+    """Up to date compiled module of a .ui file, compiled again if needed."""
+    ui_path = Path(ui_path)
+    module_path = cache_path(ui_path)
+    if not module_path.exists() or cached_key(module_path)[0] != ui_hash(ui_path):
+        return compile_ui(ui_path)
+    return module_path
+
+
+def loadUiType(ui_name):
+    """Same as uic.loadUiType, from the cache. Returns (form class, base class)."""
+    ui_path = Path(home, ui_name)
+    try:
+        module_path = compiled(ui_path)
+    except OSError:  # read only installation, compiled at each launch
+        return uic.loadUiType(str(ui_path))
+
+    name = module_path.stem
+    spec = importlib.util.spec_from_file_location(name, module_path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    form = next(value for key, value in vars(module).items() if key.startswith('Ui_'))
+    base = getattr(QtWidgets, cached_key(module_path)[1])
+    return form, base
+
+
+if __name__ == '__main__':  # only executes the below code if  main
+    for ui_path in sorted(Path(home).glob('*.ui')):
+        print(compile_ui(ui_path))
+    sys.exit()